@@ -4,6 +4,8 @@
 
 import numpy as np
 from Coefficients import Coefficients
+from Kernels import kernel, SCHEMES
+from Timer import timed
 
 class Advection1D(Coefficients):
     """
@@ -11,12 +13,14 @@ class Advection1D(Coefficients):
     (aP, aW,aE). Esta clase hereda de la clase Coefficients.
     
     Métodos:
-        constructor(nvx,Gamma,dx): inicia los atributos nvx y dx de acuerdo a la clase padre además del
-                                   atributo Gamma
+        constructor(nvx,rho,dx,coef): inicia los atributos nvx y dx de acuerdo a la clase padre además del
+                                      atributo rho. Si se da 'coef' (objeto Coefficients) los
+                                      coeficientes se acumulan en los arreglos de ese objeto
         destructor(): delete atributes
         calcCoef(metodo): Calcula los coeficientes difusivos de acuerdo al esquema indicado por la 
                           variable 'metodo' y actualiza los coficientes generales (aP, aW,aE). Los esquemas
-                          posibles son: 'DifCentrales','Upwind1','Upwind2','Quick'
+                          posibles son: 'DifCentrales','Upwind1','Upwind2','Quick'. Con un
+                          solo caso usa el kernel compilado si el backend es 'numba' (ver Kernels)
         setU(u): set velocidad u
         u: get velocidad u
   
@@ -26,14 +30,17 @@ class Advection1D(Coefficients):
         aW: Coeficiente de nodo anterior
         aEE: Coeficiente del segundo nodo siguiente
         aWW: Coeficiente de segundo nodo anterior
-        Gamma: Coeficiente Difussivo
-        dx: tamaño del los volumenes
+        rho: densidad
+        dx: tamaño del los volumenes (escalar o arreglo por volumen en mallas no uniformes). En
+            mallas no uniformes 'DifCentrales' interpola linealmente en las caras con el tamaño de
+            los volúmenes; 'Upwind1' no depende de dx y 'Upwind2' y 'Quick' usan los pesos de
+            malla uniforme.
         u: velocidad
         
     """
     
-    def __init__(self, nvx = None, rho = None, dx = None):
-        super().__init__(nvx)
+    def __init__(self, nvx = None, rho = None, dx = None, coef = None):
+        super().__init__(nvx, dx, coef)
         self.__nvx = nvx
         self.__rho = rho
         self.__dx = dx
@@ -46,7 +53,7 @@ class Advection1D(Coefficients):
         del(self.__u)
 
     def setU(self, u):
-        if type(u) == float:
+        if np.isscalar(u):
             self.__u.fill(u)
         else:
             self.__u = u
@@ -54,6 +61,7 @@ class Advection1D(Coefficients):
     def u(self):
         return self.__u
     
+    @timed()
     def calcCoef(self,metodo='Upwind2'):
         aE = self.aE()
         aW = self.aW()
@@ -63,43 +71,68 @@ class Advection1D(Coefficients):
         u = self.__u
         rho = self.__rho
 
-        for i in range(1,self.__nvx-1):
-            if metodo=='DifCentrales':
-                # Diferencias Centrales
-                CE = - rho * u[i] * 0.5
-                CW =   rho * u[i-1] * 0.5 
-                aE[i] += CE
-                aW[i] += CW
-                aP[i] += CE + CW + rho * (u[i] - u[i - 1])
-            elif metodo == 'Upwind1':
-                # ------------- Upwind-------------------
-                CE = max((-rho*u[i],0)) 
-                CW = max((rho*u[i-1],0))
-                aE[i] += CE 
-                aW[i] += CW
-                aP[i] += CE + CW + rho * (u[i] - u[i-1])
-            elif metodo == 'Upwind2':                
-                #-------------Second Order Upwind -----------------
-                CE = 1.5*max((-rho*u[i],0)) + 0.5*max((-rho*u[i-1],0))
-                CW = 1.5*max((rho*u[i-1],0)) + 0.5*max((rho*u[i],0))
-                CEE = -0.5*max((-rho*u[i],0))     
-                CWW = -0.5*max((rho*u[i-1],0))
-                aE[i] += CE 
-                aW[i] += CW
-                aEE[i] += CEE 
-                aWW[i] += CWW
-                aP[i] += CE + CW+ CEE + CWW + rho * (u[i] - u[i-1]) 
-            elif metodo == 'Quick':
-                #----------------QUICK---------------------
-                CE = (-3./8.)*max((rho*u[i],0)) + (6./8.)*max((-rho*u[i],0)) + (1./8.)*max((-rho*u[i-1],0))
-                CW = (1./8.)*max((rho*u[i],0)) + (6./8.)*max((rho*u[i-1],0)) + (-3./8.)*max((-rho*u[i-1],0))
-                CEE = -(1./8.)*max((-rho*u[i],0))     
-                CWW = -(1./8.)*max((rho*u[i-1],0))
-                aE[i] += CE 
-                aW[i] += CW
-                aEE[i] += CEE 
-                aWW[i] += CWW
-                aP[i] += CE + CW+ CEE + CWW + rho * (u[i] - u[i-1])                            
+        # Velocidades en las caras este (u[i]) y oeste (u[i-1]) de los volúmenes interiores
+        # (el último eje es el espacial, así funciona también con varios casos apilados)
+        ue = u[...,1:]
+        uw = u[...,:-1]
+        ge = gw = 0.5
+        dx = self.__dx
+        if np.shape(dx)[-1:] == (self.__nvx,):
+            # Peso del vecino en cada cara para la interpolación lineal en mallas no uniformes
+            g = dx[...,:-1] / (dx[...,:-1] + dx[...,1:])
+            ge = g[...,1:]
+            gw = 1 - g[...,:-1]
+        loop = kernel('advection')
+        if loop is not None and np.ndim(aP) == 1 and np.ndim(rho) == 0 and metodo in SCHEMES:
+            # Kernel compilado (ver Kernels), un solo ciclo sobre los volúmenes
+            N = aP.size - 2
+            loop(SCHEMES[metodo], float(rho), np.asarray(u, dtype = float),
+                 np.broadcast_to(ge, (N,)), np.broadcast_to(gw, (N,)), aP, aE, aW, aEE, aWW)
+            return
+        coef = advectiveCoef(metodo, rho, ue, uw, ge, gw)
+        if coef is None:
+            return
+        CE, CW, CEE, CWW = coef
+        aE[...,1:-1] += CE
+        aW[...,1:-1] += CW
+        aEE[...,1:-1] += CEE
+        aWW[...,1:-1] += CWW
+        aP[...,1:-1] += CE + CW + CEE + CWW + rho * (ue - uw)
+
+def advectiveCoef(metodo, rho, ue, uw, ge = 0.5, gw = 0.5):
+    """
+    Calcula (con operaciones sobre arreglos completos) los coeficientes advectivos CE, CW, CEE y CWW
+    del esquema 'metodo' a partir de las velocidades en las caras este (ue) y oeste (uw). Los
+    arreglos pueden tener cualquier forma compatible (por ejemplo (casos, nvx-2)). ge y gw son los
+    pesos del vecino este (en la cara este) y del vecino oeste (en la cara oeste) para la
+    interpolación de 'DifCentrales' (0.5 en mallas uniformes). Regresa None si el esquema no existe.
+    """
+    Fe = rho * ue
+    Fw = rho * uw
+    if metodo == 'DifCentrales':
+        # Diferencias Centrales
+        CE = - Fe * ge
+        CW =   Fw * gw
+        return CE, CW, 0., 0.
+    # Flujos positivos y negativos en cada cara: max(F,0) y max(-F,0)
+    Fep = np.maximum(Fe, 0)
+    Fen = np.maximum(-Fe, 0)
+    Fwp = np.maximum(Fw, 0)
+    Fwn = np.maximum(-Fw, 0)
+    if metodo == 'Upwind1':
+        # ------------- Upwind-------------------
+        return Fen, Fwp, 0., 0.
+    elif metodo == 'Upwind2':
+        #-------------Second Order Upwind -----------------
+        CE = 1.5*Fen + 0.5*Fwn
+        CW = 1.5*Fwp + 0.5*Fep
+        return CE, CW, -0.5*Fen, -0.5*Fwp
+    elif metodo == 'Quick':
+        #----------------QUICK---------------------
+        CE = (-3./8.)*Fep + (6./8.)*Fen + (1./8.)*Fwn
+        CW = (1./8.)*Fep + (6./8.)*Fwp + (-3./8.)*Fwn
+        return CE, CW, -(1./8.)*Fen, -(1./8.)*Fwp
+    return None
 
 if __name__ == '__main__':
     
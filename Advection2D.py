@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Coefficients2D import Coefficients2D
+from Timer import timed
+
+class Advection2D(Coefficients2D):
+    """
+    Clase que calcula los coeficientes advectivos en 2D y actualiza los coeficientes generales.
+    Hereda de Coefficients2D. Las velocidades se dan en las caras (u en las caras en x, (ny, nx+1);
+    v en las caras en y, (ny+1, nx)) y los flujos de masa F = rho * velocidad * área se calculan
+    para todas las caras a la vez. Para cada cara, con F positivo en la dirección de x (o y):
+
+        'Upwind1':      aE del volumen izquierdo += max(-F, 0),  aW del derecho += max(F, 0)
+        'DifCentrales': aE del volumen izquierdo += -F/2,        aW del derecho += F/2
+
+    y aP = suma de los vecinos + flujo neto que sale del volumen (con un campo de velocidad que
+    conserva la masa el flujo neto es cero). En las caras de la frontera siempre se usa upwind (el
+    valor que entra es el de la frontera y el que sale el del volumen).
+
+    Métodos:
+        constructor(nx,ny,rho,dx,dy,coef): número y tamaño de los volúmenes, densidad y objeto
+                  Coefficients2D a compartir
+        setU(u,v): set velocidades en las caras (escalares o arreglos)
+        u(), v(): get velocidades en las caras
+        calcCoef(metodo): calcula los coeficientes advectivos ('Upwind1' o 'DifCentrales') y los
+                          suma a los generales
+
+    Atributos:
+        rho: densidad
+        u, v: velocidades en las caras
+    """
+
+    def __init__(self, nx = None, ny = None, rho = None, dx = None, dy = None, coef = None):
+        super().__init__(nx, ny, dx, dy, coef)
+        self.__rho = rho
+        self.__u = np.zeros((ny, nx + 1))
+        self.__v = np.zeros((ny + 1, nx))
+
+    def setU(self, u, v = 0.0):
+        if np.isscalar(u):
+            self.__u.fill(u)
+        else:
+            self.__u = u
+        if np.isscalar(v):
+            self.__v.fill(v)
+        else:
+            self.__v = v
+
+    def u(self):
+        return self.__u
+
+    def v(self):
+        return self.__v
+
+    @staticmethod
+    def faceCoef(metodo, F):
+        """
+        Regresa (cL, cR) para las caras con flujo F: cL se suma al coeficiente del vecino de
+        adelante del volumen de atrás (aE o aN) y cR al del vecino de atrás del volumen de
+        adelante (aW o aS). Las caras de la frontera (primera y última) son siempre upwind.
+        """
+        cL = np.maximum(-F, 0)
+        cR = np.maximum(F, 0)
+        if metodo == 'DifCentrales':
+            cL[...,1:-1] = -0.5 * F[...,1:-1]
+            cR[...,1:-1] = 0.5 * F[...,1:-1]
+        return cL, cR
+
+    @timed()
+    def calcCoef(self, metodo = 'Upwind1'):
+        aP = self.aP()
+        aE = self.aE()
+        aW = self.aW()
+        aN = self.aN()
+        aS = self.aS()
+        Fx = self.__rho * self.__u * self.dy()
+        Fy = self.__rho * self.__v * self.dx()
+
+        cL, cR = Advection2D.faceCoef(metodo, Fx)
+        aE += cL[:,1:]
+        aW += cR[:,:-1]
+        aP += cL[:,1:] + cR[:,:-1] + Fx[:,1:] - Fx[:,:-1]
+        # Se transpone para que la dirección y quede en el último eje
+        cL, cR = Advection2D.faceCoef(metodo, Fy.T)
+        cL, cR = cL.T, cR.T
+        aN += cL[1:]
+        aS += cR[:-1]
+        aP += cL[1:] + cR[:-1] + Fy[1:] - Fy[:-1]
+
+if __name__ == '__main__':
+
+    adv = Advection2D(4, 3, rho = 1.0, dx = 0.25, dy = 1/3)
+    adv.alloc()
+    adv.setU(1.0, 0.5)
+    adv.calcCoef('Upwind1')
+    print(adv.aP(), adv.aE(), adv.aW(), adv.aN(), adv.aS(), sep = '\n')
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Mesh import Mesh
+from Coefficients import Coefficients
+from Diffusion import Diffusion1D
+from Advection import Advection1D
+from Matrix import Matrix
+from Timer import timed
+
+class Batch1D():
+    """
+    Clase que resuelve muchos casos del problema de advección-difusión 1D estacionario con
+    condiciones de Dirichlet en ambas fronteras (como en el ejemplo 5.1 de Malalasekera) para
+    barridos de parámetros. Los casos se agrupan por número de nodos y esquema advectivo; en cada
+    grupo los coeficientes se calculan apilados en arreglos de forma (casos, nvx) y todos los
+    sistemas se resuelven en una sola llamada por bandas.
+
+    Métodos:
+        constructor(nodes,length,Gamma,rho,u,metodo,phi0,phiL): recibe los parámetros de los casos.
+                  Cada parámetro puede ser un escalar (igual para todos los casos) o un arreglo con
+                  un valor por caso.
+        cases(): get número de casos
+        groups(): regresa un diccionario {(nodos, metodo): índices de los casos del grupo}
+        solve(): resuelve todos los casos y regresa una lista con la solución de cada caso
+                 (incluyendo las fronteras), en el mismo orden en que se dieron los parámetros
+        mesh(i): regresa las coordenadas de la malla del caso i
+
+    Atributos:
+        nodes, length, Gamma, rho, u, metodo, phi0, phiL: parámetros de cada caso (arreglos)
+    """
+
+    def __init__(self, nodes = None, length = None, Gamma = None, rho = 1.0, u = 0.0,
+                 metodo = 'Upwind1', phi0 = 1.0, phiL = 0.0):
+        metodo = np.asarray(metodo, dtype = object)
+        (self.__nodes, self.__length, self.__Gamma, self.__rho, self.__u,
+         self.__phi0, self.__phiL, self.__metodo) = np.broadcast_arrays(
+            np.asarray(nodes, dtype = int), np.asarray(length, dtype = float),
+            np.asarray(Gamma, dtype = float), np.asarray(rho, dtype = float),
+            np.asarray(u, dtype = float), np.asarray(phi0, dtype = float),
+            np.asarray(phiL, dtype = float), metodo)
+        if self.__nodes.ndim == 0:
+            (self.__nodes, self.__length, self.__Gamma, self.__rho, self.__u,
+             self.__phi0, self.__phiL, self.__metodo) = [a.reshape(1) for a in
+                (self.__nodes, self.__length, self.__Gamma, self.__rho, self.__u,
+                 self.__phi0, self.__phiL, self.__metodo)]
+
+    def cases(self):
+        return self.__nodes.size
+
+    def groups(self):
+        groups = {}
+        for i, (nodes, metodo) in enumerate(zip(self.__nodes, self.__metodo)):
+            groups.setdefault((int(nodes), str(metodo)), []).append(i)
+        return {key: np.array(idx) for key, idx in groups.items()}
+
+    def mesh(self, i):
+        return Mesh(nodes = int(self.__nodes[i]), length = float(self.__length[i])).createMesh()
+
+    @timed()
+    def solve(self):
+        solutions = [None] * self.cases()
+        for (nodes, metodo), idx in self.groups().items():
+            phi = self.__solveGroup(nodes, metodo, idx)
+            for k, i in enumerate(idx):
+                solutions[i] = phi[k]
+        return solutions
+
+    def __solveGroup(self, nodes, metodo, idx):
+        cases = len(idx)
+        nvx = nodes + 1
+        # Parámetros de forma (casos, 1) para que se propaguen sobre el eje espacial
+        dx = (self.__length[idx] / (nodes - 1))[:,None]
+        Gamma = self.__Gamma[idx][:,None]
+        rho = self.__rho[idx][:,None]
+        phi0 = self.__phi0[idx]
+        phiL = self.__phiL[idx]
+
+        coef = Coefficients(nvx, dx)
+        coef.alloc(nvx, cases = cases)
+        dif = Diffusion1D(nvx, Gamma = Gamma, dx = dx, coef = coef)
+        dif.calcCoef()
+        adv = Advection1D(nvx, rho = rho, dx = dx, coef = coef)
+        adv.setU(np.repeat(self.__u[idx][:,None], nvx - 1, axis = 1))
+        adv.calcCoef(metodo)
+        coef.bcDirichlet('LEFT_WALL', phi0)
+        coef.bcDirichlet('RIGHT_WALL', phiL)
+
+        A = Matrix(nvx, storage = 'banded', cases = cases)
+        A.build(coef)
+        phi = np.empty((cases, nvx))
+        phi[:,0] = phi0
+        phi[:,-1] = phiL
+        phi[:,1:-1] = A.solve(coef.Su()[:,1:-1])
+        return phi
+
+if __name__ == '__main__':
+
+    # Barrido del ejemplo 5.1 de Malalasekera sobre velocidades y esquemas
+    u = np.array([0.1, 2.5, 0.1, 2.5])
+    metodo = ['Upwind1', 'Upwind1', 'Quick', 'Quick']
+    batch = Batch1D(nodes = 6, length = 1.0, Gamma = 0.1, rho = 1.0, u = u,
+                    metodo = metodo, phi0 = 1, phiL = 0)
+    print(batch.groups())
+    print('-' * 20)
+    for i, phi in enumerate(batch.solve()):
+        print(metodo[i], u[i], phi)
+    print('-' * 20)
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo con las pruebas de rendimiento del método de volumen finito. Se mide el tiempo de las
+etapas del cálculo para distintos tamaños de malla (N incógnitas, de 10 a 10^6):
+
+    Mesh.createMesh
+    Diffusion1D.calcCoef
+    Advection1D.calcCoef (uno por esquema)
+    Matrix.build y Matrix.solve (uno por tipo de almacenamiento; 'dense' sólo para N chicas)
+
+También se mide el tiempo de 'import FiniteVolumeMethod' en un proceso nuevo, que debe quedar
+dentro de un presupuesto (IMPORT_BUDGET segundos) y no debe cargar las dependencias que sólo se
+usan para reportes, gráficas o solución (HEAVY: pandas, matplotlib, scipy), que se importan en
+su primer uso.
+
+Cada medición es el mejor tiempo (por llamada) de 'repeat' repeticiones, después de una llamada
+de calentamiento; en las funciones muy rápidas cada repetición hace varias llamadas seguidas hasta
+durar al menos MIN_SAMPLE segundos, para que la resolución del reloj y las interrupciones no
+dominen. Los resultados se agregan a un historial en formato JSON lines (un renglón por
+medición, con la fecha y la máquina) y se comparan contra una línea base guardada en JSON; una
+medición es una regresión si es más lenta que la base por más de 'threshold' (relativo) y por
+más de 'floor' segundos (absoluto; FLOOR por omisión, porque abajo de eso dos corridas sin cambios
+difieren por ruido en decenas de por ciento).
+
+El historial y la línea base se guardan en el directorio 'output' (FVM_BENCH_DIR o OUTPUT por
+omisión, ignorado por git), no en el directorio de trabajo.
+
+Uso:
+    python Benchmark.py                      # corre y agrega al historial
+    python Benchmark.py --save-baseline      # además guarda la línea base
+    python Benchmark.py --sizes 10 1000 --repeat 3 --threshold 0.5 --floor 1e-3
+    python Benchmark.py --output /tmp/bench  # historial y línea base en otro directorio
+    python Benchmark.py --import-only --import-budget 0.2
+Si hay regresiones o se excede el presupuesto de importación el programa termina con código 1.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from Mesh import Mesh
+from Coefficients import Coefficients
+from Diffusion import Diffusion1D
+from Advection import Advection1D
+from Matrix import Matrix
+
+SIZES = (10, 100, 1000, 10000, 100000, 1000000)
+SCHEMES = ('DifCentrales', 'Upwind1', 'Upwind2', 'Quick')
+STORAGES = ('dense', 'banded', 'sparse')
+DENSE_MAX = 2000
+IMPORT_BUDGET = 0.25
+MIN_SAMPLE = 1e-3
+FLOOR = 5e-4
+OUTPUT = os.environ.get('FVM_BENCH_DIR', 'benchmark-results')
+HEAVY = ('pandas', 'matplotlib', 'scipy')
+
+def timeit(f, repeat = 5):
+    """
+    Regresa el mejor tiempo por llamada (en segundos) de 'repeat' repeticiones de f(). Cada
+    repetición hace 'number' llamadas, con 'number' tal que dure al menos MIN_SAMPLE segundos.
+    """
+    t1 = time.perf_counter()
+    f()
+    number = max(1, int(np.ceil(MIN_SAMPLE / max(time.perf_counter() - t1, 1e-9))))
+    best = np.inf
+    for i in range(repeat):
+        t1 = time.perf_counter()
+        for n in range(number):
+            f()
+        t2 = time.perf_counter()
+        best = min(best, (t2 - t1) / number)
+    return best
+
+def problem(N):
+    """
+    Crea la malla y los objetos de difusión y advección (ejemplo 5.1 de Malalasekera) con N
+    incógnitas. Regresa (malla, coef, dif, adv).
+    """
+    malla = Mesh(nodes = N + 1, length = 1.0)
+    nvx = malla.volumes()
+    delta = malla.delta()
+    coef = Coefficients(nvx, delta)
+    coef.alloc(nvx)
+    dif = Diffusion1D(nvx, Gamma = 0.1, dx = delta, coef = coef)
+    adv = Advection1D(nvx, rho = 1.0, dx = delta, coef = coef)
+    adv.setU(0.1)
+    return malla, coef, dif, adv
+
+def run(sizes = SIZES, repeat = 5, storages = STORAGES, schemes = SCHEMES):
+    """
+    Corre todas las mediciones y regresa una lista de diccionarios {name, N, time}.
+    """
+    records = []
+    def record(name, N, f):
+        records.append({'name': name, 'N': N, 'time': timeit(f, repeat)})
+
+    for N in sizes:
+        malla, coef, dif, adv = problem(N)
+        nvx = malla.volumes()
+        record('Mesh.createMesh', N, malla.createMesh)
+        # calcCoef acumula sobre los arreglos; para medir el tiempo no importan los valores
+        record('Diffusion1D.calcCoef', N, dif.calcCoef)
+        for metodo in schemes:
+            record('Advection1D.calcCoef[' + metodo + ']', N, lambda: adv.calcCoef(metodo))
+
+        # Sistema bien definido para construir y resolver
+        coef.alloc(nvx)
+        dif.calcCoef()
+        adv.calcCoef('Upwind1')
+        coef.bcDirichlet('LEFT_WALL', 1)
+        coef.bcDirichlet('RIGHT_WALL', 0)
+        b = coef.Su()[1:-1]
+        for storage in storages:
+            if storage == 'dense' and N > DENSE_MAX:
+                continue
+            A = Matrix(nvx, storage = storage)
+            record('Matrix.build[' + storage + ']', N, lambda: A.build(coef))
+            record('Matrix.solve[' + storage + ']', N, lambda: A.solve(b))
+    return records
+
+def importTime(module = 'FiniteVolumeMethod', repeat = 5):
+    """
+    Mide (en un proceso nuevo, para que no haya módulos en caché) el tiempo de importar 'module'.
+    Regresa (mejor tiempo, lista de los módulos de HEAVY que quedaron cargados).
+    """
+    code = ('import sys, time\n'
+            't = time.perf_counter()\n'
+            'import ' + module + '\n'
+            't = time.perf_counter() - t\n'
+            'print(t)\n'
+            'print(" ".join(m for m in ' + repr(HEAVY) + ' if m in sys.modules))\n')
+    # El proceso corre en el directorio del paquete para encontrar los módulos
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    best = np.inf
+    for i in range(repeat):
+        out = subprocess.run([sys.executable, '-c', code], capture_output = True, text = True,
+                             check = True, cwd = cwd).stdout.split('\n')
+        best = min(best, float(out[0]))
+    return best, out[1].split()
+
+def key(r):
+    return r['name'] + ':' + str(r['N'])
+
+def machine():
+    return {'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'host': platform.node(),
+            'python': platform.python_version(), 'numpy': np.__version__}
+
+def saveHistory(records, path = os.path.join(OUTPUT, 'benchmark-history.jsonl')):
+    # Se agrega un renglón por medición para poder seguir cada una en el tiempo
+    info = machine()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+    with open(path, 'a') as f:
+        for r in records:
+            f.write(json.dumps(dict(info, **r)) + '\n')
+
+def saveBaseline(records, path = os.path.join(OUTPUT, 'benchmark-baseline.json')):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok = True)
+    with open(path, 'w') as f:
+        json.dump({'machine': machine(), 'times': {key(r): r['time'] for r in records}}, f,
+                  indent = 1)
+
+def loadBaseline(path = os.path.join(OUTPUT, 'benchmark-baseline.json')):
+    with open(path) as f:
+        return json.load(f)['times']
+
+def compare(records, baseline, threshold = 0.25, floor = FLOOR):
+    """
+    Compara las mediciones con la línea base. Regresa la lista de regresiones como tuplas
+    (llave, tiempo base, tiempo actual, cambio relativo).
+    """
+    regressions = []
+    for r in records:
+        base = baseline.get(key(r))
+        if base is None:
+            continue
+        change = (r['time'] - base) / base
+        if change > threshold and r['time'] - base > floor:
+            regressions.append((key(r), base, r['time'], change))
+    return regressions
+
+def report(records, baseline = None):
+    print('.' + '-' * 70 + '.')
+    print('|{:^70}|'.format('Benchmark'))
+    print('.' + '-' * 70 + '.')
+    for r in records:
+        line = '{:36s} {:>8d} {:12.3e} s'.format(r['name'], r['N'], r['time'])
+        if baseline and key(r) in baseline:
+            line += ' {:+7.1%}'.format(r['time'] / baseline[key(r)] - 1)
+        print('|{:70s}|'.format(line))
+    print('.' + '-' * 70 + '.')
+
+if __name__ == '__main__':
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description = 'Pruebas de rendimiento del FVM')
+    parser.add_argument('--sizes', type = int, nargs = '+', default = list(SIZES))
+    parser.add_argument('--repeat', type = int, default = 5)
+    parser.add_argument('--output', default = OUTPUT)
+    parser.add_argument('--history', default = 'benchmark-history.jsonl')
+    parser.add_argument('--baseline', default = 'benchmark-baseline.json')
+    parser.add_argument('--save-baseline', action = 'store_true')
+    parser.add_argument('--threshold', type = float, default = 0.25)
+    parser.add_argument('--floor', type = float, default = FLOOR)
+    parser.add_argument('--import-budget', type = float, default = IMPORT_BUDGET)
+    parser.add_argument('--import-only', action = 'store_true')
+    args = parser.parse_args()
+    # Las rutas relativas del historial y la línea base son relativas al directorio de salida
+    args.history = os.path.join(args.output, args.history)
+    args.baseline = os.path.join(args.output, args.baseline)
+
+    t, heavy = importTime(repeat = args.repeat)
+    print('import FiniteVolumeMethod: {:.3f} s (presupuesto {:.3f} s)'.format(t, args.import_budget))
+    failed = t > args.import_budget or bool(heavy)
+    if heavy:
+        print('Dependencias cargadas al importar: ' + ', '.join(heavy))
+    if args.import_only:
+        sys.exit(1 if failed else 0)
+
+    records = run(args.sizes, args.repeat)
+    records.append({'name': 'import FiniteVolumeMethod', 'N': 0, 'time': t})
+    baseline = loadBaseline(args.baseline) if os.path.exists(args.baseline) else None
+    report(records, baseline)
+    saveHistory(records, args.history)
+    if args.save_baseline:
+        saveBaseline(records, args.baseline)
+    elif baseline:
+        regressions = compare(records, baseline, args.threshold, args.floor)
+        for name, base, t, change in regressions:
+            print('Regresión: {} {:.3e} s -> {:.3e} s ({:+.1%})'.format(name, base, t, change))
+        failed = failed or bool(regressions)
+    sys.exit(1 if failed else 0)
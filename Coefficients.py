@@ -2,20 +2,32 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
+from Timer import timed
 
 class Coefficients():
     """
     Esta clase define los arreglos principales para los coeficientes del
-    metodo de Volumen Finito. Los arreglos son definidos como variables de
-    clase para que sean compartidos por todos los objetos de esta clase.
+    metodo de Volumen Finito. Los arreglos pertenecen a cada problema (objeto) y no a la clase, de
+    modo que se pueden tener varios problemas independientes en el mismo proceso (por ejemplo
+    resolviéndolos desde un pool de hilos). Para que varios objetos (Diffusion1D, Advection1D, etc.)
+    acumulen sus contribuciones sobre los mismos arreglos se pasa el objeto a compartir en el
+    argumento 'coef' del constructor.
     
         Métodos:
-        constructor(nvx,delta): inicia los atributos nvx y delta
+        constructor(nvx,delta,coef): inicia los atributos nvx y delta; si se da 'coef' los arreglos
+                                     de coeficientes se comparten con ese objeto
         destructor(): delete atributes
-        alloc(n): asigna arreglos con ceros a los atributos de coeficientes (aP, aE, etc.) con
-                  el objetivo de reservar memoria
+        alloc(n,cases,dtype): asigna arreglos con ceros a los atributos de coeficientes (aP, aE, etc.)
+                        con el objetivo de reservar memoria. Si se da 'cases' los arreglos tienen
+                        forma (cases, nvx) para resolver varios casos a la vez. dtype es el tipo de
+                        punto flotante (np.float32 reduce a la mitad la memoria y el ancho de banda)
+        dtype(): get tipo de punto flotante de los arreglos
         setVolumes(nvx): set atributo nvx
         setDelta(delta): set atributo delta
+        delta(): get delta
+        arrays(): get diccionario con los arreglos de coeficientes
+        setArrays(**arrays): set arreglos de coeficientes ya calculados (por ejemplo leídos de un
+                             archivo), compartidos con los objetos que comparten coeficientes
         aP():get aP
         aW(): get aW
         aWW(): get aWW
@@ -26,6 +38,7 @@ class Coefficients():
                                de acuerdo a la condición de frontera con valor 'phi'
         bcNeumman(wall,flux): ajusta los coeficientes de la frontera 'wall' (puede ser 'LEFT_WALL' o 'RIGHT_WALL')
                                de acuerdo a la condición de frontera con flujo de valor 'flux'
+        deltaAt(i): tamaño del volumen i
         setsU(q): set atributo Su
         setSp(Sp): set atributo Sp
 
@@ -37,7 +50,7 @@ class Coefficients():
         aEE: Coeficiente del segundo nodo siguiente
         aWW: Coeficiente de segundo nodo anterior
         Gamma: Coeficiente Difussivo
-        delta: tamaño del los volumenes
+        delta: tamaño del los volumenes (escalar o arreglo por volumen en mallas no uniformes)
         u: velocidad
         sU: coeficientes que representan los términos independientes del sistema de ecuaciones a
                resolver y que son consecuencia de las fuentes
@@ -45,77 +58,85 @@ class Coefficients():
         
     """    
     
-    #atributos
-    __aP = None
-    __aE = None
-    __aW = None
-    __aEE = None
-    __aWW = None
-    __Su = None
-    __nvx = None
-    __delta = None
-
-    def __init__(self, nvx = None, delta = None):
-        Coefficients.__nvx = nvx
-        Coefficients.__delta = delta
-
-
-    @staticmethod
-    def alloc(n):
-        if Coefficients.__nvx:
-            nvx = Coefficients.__nvx
+    def __init__(self, nvx = None, delta = None, coef = None):
+        self.__nvx = nvx
+        self.__delta = delta
+        # Los arreglos se guardan en un diccionario para que los objetos que comparten
+        # coeficientes vean también los arreglos asignados después con alloc()
+        if coef is None:
+            self.__arrays = dict.fromkeys(('aP', 'aE', 'aW', 'aEE', 'aWW', 'Su'))
+        else:
+            self.__arrays = coef.__arrays
+
+    def alloc(self, n, cases = None, dtype = float):
+        if self.__nvx:
+            nvx = self.__nvx
         else:
             nvx = n
-        Coefficients.__aP = np.zeros(nvx)
-        Coefficients.__aE = np.zeros(nvx)
-        Coefficients.__aW = np.zeros(nvx)
-        Coefficients.__aEE = np.zeros(nvx)
-        Coefficients.__aWW = np.zeros(nvx)
-        Coefficients.__Su = np.zeros(nvx)        
+        shape = nvx if cases is None else (cases, nvx)
+        for key in self.__arrays:
+            self.__arrays[key] = np.zeros(shape, dtype = dtype)
+
+    def dtype(self):
+        return self.__arrays['aP'].dtype
     
     def setVolumes(self, nvx):
-        Coefficients.__nvx = nvx
+        self.__nvx = nvx
         
     def setDelta(self, delta):
-        Coefficients.__delta = delta
+        self.__delta = delta
+
+    def delta(self):
+        return self.__delta
+
+    def arrays(self):
+        return dict(self.__arrays)
+
+    def setArrays(self, **arrays):
+        # Se actualiza el mismo diccionario para no romper la compartición con otros objetos
+        for key, value in arrays.items():
+            if key in self.__arrays:
+                self.__arrays[key] = value
         
     def aP(self):
-        return Coefficients.__aP
+        return self.__arrays['aP']
 
     def aE(self):
-        return Coefficients.__aE
+        return self.__arrays['aE']
     
     def aW(self):
-        return Coefficients.__aW
+        return self.__arrays['aW']
     
     def aEE(self):
-        return Coefficients.__aEE
+        return self.__arrays['aEE']
     
     def aWW(self):
-        return Coefficients.__aWW
+        return self.__arrays['aWW']
     
     def Su(self):
-        return Coefficients.__Su
+        return self.__arrays['Su']
 
-    @staticmethod
-    def bcDirichlet(wall, phi):
-        aP = Coefficients.__aP
-        aE = Coefficients.__aE
-        aW = Coefficients.__aW
-        aEE = Coefficients.__aEE
-        aWW = Coefficients.__aWW
-        Su = Coefficients.__Su
+    @timed()
+    def bcDirichlet(self, wall, phi):
+        aP = self.aP()
+        aE = self.aE()
+        aW = self.aW()
+        aEE = self.aEE()
+        aWW = self.aWW()
+        Su = self.Su()
 
+        # Los índices se toman sobre el último eje para que los mismos métodos sirvan con arreglos
+        # de varios casos apilados (forma (casos, nvx))
         if wall == 'LEFT_WALL':
-            aP[1] += aW[1] + 3*aWW[1]
-            Su[1] += (2 *aW[1] + 4*aWW[1]) * phi
-            aW[2] -= aWW[2] #condición del segundo nodo (requerida en métodos de orden mayor a 1)
-            Su[2] += (2 *aWW[2] ) * phi
+            aP[...,1] += aW[...,1] + 3*aWW[...,1]
+            Su[...,1] += (2 *aW[...,1] + 4*aWW[...,1]) * phi
+            aW[...,2] -= aWW[...,2] #condición del segundo nodo (requerida en métodos de orden mayor a 1)
+            Su[...,2] += (2 *aWW[...,2] ) * phi
         elif wall == 'RIGHT_WALL':
-            aP[-2] += aE[-2] + 3*aEE[1]
-            Su[-2] += (2 *aE[-2] + 4*aEE[1] )* phi
-            aE[2] -= aEE[2] #condición del penúltimo nodo (requerida en métodos de orden mayor a 1)
-            Su[-3] += (2*aEE[1] )* phi
+            aP[...,-2] += aE[...,-2] + 3*aEE[...,-2]
+            Su[...,-2] += (2 *aE[...,-2] + 4*aEE[...,-2] )* phi
+            aE[...,-3] -= aEE[...,-3] #condición del penúltimo nodo (requerida en métodos de orden mayor a 1)
+            Su[...,-3] += (2*aEE[...,-3] )* phi
             
 #        if wall == 'LEFT_WALL':
 #            Su[1] += (0.25*max((rho*u[i-1],0))*1)
@@ -133,29 +154,41 @@ class Coefficients():
 #            aE[2] -= 2*aEE[2]
 #            Su[2] += ( (8/3.)*aEE[2] ) * phi
             
-    @staticmethod
-    def bcNeumman(wall, flux):
-        aP = Coefficients.__aP
-        aE = Coefficients.__aE
-        aW = Coefficients.__aW
-        Su = Coefficients.__Su
-        dx = Coefficients.__delta
+    def deltaAt(self, i):
+        """
+        Tamaño del volumen i (el mismo delta si es escalar o si se tiene uno por caso).
+        """
+        dx = self.__delta
+        if np.ndim(dx) == 0:
+            return dx
+        if np.shape(dx)[-1] == 1:
+            return dx[...,0]
+        return dx[...,i]
+
+    @timed()
+    def bcNeumman(self, wall, flux):
+        aP = self.aP()
+        aE = self.aE()
+        aW = self.aW()
+        Su = self.Su()
 
         if wall == 'LEFT_WALL':
-            aP[1] -= aW[1]
-            Su[1] -= aW[1] * flux * dx
+            aP[...,1] -= aW[...,1]
+            Su[...,1] -= aW[...,1] * flux * self.deltaAt(1)
         elif wall == 'RIGHT_WALL':
-            aP[-2] -= aE[-2]
-            Su[-2] += aE[-2] * flux * dx  
+            aP[...,-2] -= aE[...,-2]
+            Su[...,-2] += aE[...,-2] * flux * self.deltaAt(-2)
             
+    @timed()
     def setSu(self, q):
-        Su = Coefficients.__Su
-        dx = Coefficients.__delta
+        Su = self.Su()
+        dx = self.__delta
         Su += q * dx
         
+    @timed()
     def setSp(self, Sp):
-        aP = Coefficients.__aP
-        dx = Coefficients.__delta
+        aP = self.aP()
+        dx = self.__delta
         aP -= Sp * dx
         
 
@@ -187,3 +220,11 @@ if __name__ == '__main__':
     print(coef1.aP(), coef1.aE(), coef1.aW(), coef1.Su(), sep = '\n')
     print('-' * 20)  
 
+
+    # Un segundo problema no modifica los arreglos del primero, salvo que se compartan
+    coef2 = Coefficients(6, 0.25)
+    coef2.alloc(6)
+    coef3 = Coefficients(6, 0.25, coef = coef2)
+    coef3.setSu(100)
+    print(coef1.Su(), coef2.Su(), sep = '\n')
+    print('-' * 20)  
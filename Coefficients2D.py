@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Timer import timed
+
+# Para cada frontera: (coeficiente que la acopla, renglones/columnas de los volúmenes vecinos)
+WALLS = {'LEFT_WALL': ('aW', (slice(None), 0)),
+         'RIGHT_WALL': ('aE', (slice(None), -1)),
+         'BOTTOM_WALL': ('aS', (0, slice(None))),
+         'TOP_WALL': ('aN', (-1, slice(None)))}
+
+class Coefficients2D():
+    """
+    Clase con los arreglos de coeficientes del método de volumen finito en 2D (aP, aE, aW, aN, aS y
+    Su), de forma (ny, nx), sólo para los volúmenes interiores. Igual que en Coefficients, los
+    arreglos se comparten entre objetos (Diffusion2D, Advection2D, etc.) pasando el objeto en el
+    argumento 'coef' del constructor.
+
+    Los coeficientes de los volúmenes junto a una frontera incluyen el acoplamiento con la
+    frontera (por ejemplo aW[:,0], calculado con la distancia del centro a la cara, dx/2) y aP
+    incluye ese acoplamiento. Con esto:
+        bcDirichlet: Su += a_b * phi (la frontera se trata como un vecino con valor conocido)
+        bcNeumman: aP -= a_b y Su += flux * área (flujo total que entra por la frontera)
+    Matrix2D no usa los acoplamientos con las fronteras.
+
+    Métodos:
+        constructor(nx,ny,dx,dy,coef): número de volúmenes, tamaño de los volúmenes (escalares o
+                  arreglos de nx y ny valores) y objeto con los arreglos a compartir
+        alloc(): asigna arreglos con ceros de forma (ny, nx)
+        aP(), aE(), aW(), aN(), aS(), Su(): get coeficientes
+        nx(), ny(): get número de volúmenes
+        dx(), dy(): get tamaño de los volúmenes como arreglos de forma (1, nx) y (ny, 1)
+        volume(): get volumen (área) de cada volumen, de forma (ny, nx)
+        bcDirichlet(wall,phi): frontera 'LEFT_WALL', 'RIGHT_WALL', 'BOTTOM_WALL' o 'TOP_WALL' con
+                               valor phi (escalar o un valor por volumen a lo largo de la frontera)
+        bcNeumman(wall,flux): frontera con flujo 'flux' (positivo hacia dentro del dominio)
+        setSu(q): agrega la fuente q (por unidad de volumen)
+        setSp(Sp): agrega la parte lineal Sp de la fuente
+
+    Atributos:
+        nx, ny: número de volúmenes
+        dx, dy: tamaño de los volúmenes
+        aP, aE, aW, aN, aS, Su: coeficientes
+    """
+
+    def __init__(self, nx = None, ny = None, dx = None, dy = None, coef = None):
+        self.__nx = nx
+        self.__ny = ny
+        self.__dx = np.broadcast_to(np.asarray(dx, dtype = float), (nx,))[None,:]
+        self.__dy = np.broadcast_to(np.asarray(dy, dtype = float), (ny,))[:,None]
+        if coef is None:
+            self.__arrays = dict.fromkeys(('aP', 'aE', 'aW', 'aN', 'aS', 'Su'))
+        else:
+            self.__arrays = coef.__arrays
+
+    def alloc(self):
+        for key in self.__arrays:
+            self.__arrays[key] = np.zeros((self.__ny, self.__nx))
+
+    def aP(self):
+        return self.__arrays['aP']
+
+    def aE(self):
+        return self.__arrays['aE']
+
+    def aW(self):
+        return self.__arrays['aW']
+
+    def aN(self):
+        return self.__arrays['aN']
+
+    def aS(self):
+        return self.__arrays['aS']
+
+    def Su(self):
+        return self.__arrays['Su']
+
+    def nx(self):
+        return self.__nx
+
+    def ny(self):
+        return self.__ny
+
+    def dx(self):
+        return self.__dx
+
+    def dy(self):
+        return self.__dy
+
+    def volume(self):
+        return self.__dx * self.__dy
+
+    def __area(self, wall):
+        # Área de las caras de la frontera (por unidad de profundidad)
+        if wall in ('LEFT_WALL', 'RIGHT_WALL'):
+            return self.__dy[:,0]
+        return self.__dx[0]
+
+    @timed()
+    def bcDirichlet(self, wall, phi):
+        name, idx = WALLS[wall]
+        self.Su()[idx] += self.__arrays[name][idx] * phi
+
+    @timed()
+    def bcNeumman(self, wall, flux):
+        name, idx = WALLS[wall]
+        self.aP()[idx] -= self.__arrays[name][idx]
+        self.Su()[idx] += flux * self.__area(wall)
+
+    @timed()
+    def setSu(self, q):
+        Su = self.Su()
+        Su += q * self.volume()
+
+    @timed()
+    def setSp(self, Sp):
+        aP = self.aP()
+        aP -= Sp * self.volume()
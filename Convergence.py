@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo para estudios de convergencia de malla. Un caso (diccionario con el formato de Sweep) se
+resuelve en una escalera de mallas, cada una 'refine' veces más fina que la anterior, para
+varios esquemas advectivos; todas las mallas se resuelven en paralelo con Sweep.runSweep. Para
+cada malla se calculan:
+
+    L1, L2, Linf: normas del error contra la solución analítica del caso (si la tiene), pesadas
+                  con el tamaño de los volúmenes para que no dependan del número de volúmenes:
+                  L1 = sum|e| dx / L,  L2 = sqrt(sum e^2 dx / L),  Linf = max|e|
+    p_L1, p_L2, p_Linf: orden observado entre la malla anterior y ésta, log(E_c / E_f) / log(r)
+    p_R: orden observado sin solución analítica, con tres mallas consecutivas
+    Richardson: estimación del error (norma L2) de la malla con la extrapolación de Richardson,
+                ||phi_f - phi_c|| / (r^p - 1)
+    Estimado: error (norma L2) de la malla contra la solución extrapolada de las tres mallas más
+              finas (requiere levels >= 3), evaluada en los centros de la malla con un spline
+              cúbico; es la estimación que se usa sin solución analítica, porque en las mallas
+              gruesas (fuera del rango asintótico) p_R puede ser engañoso
+    p_formal: orden formal del esquema (ORDER; 2 sin advección)
+    p_Estimado: orden con el que se extrapola para Estimado: p_R de las tres mallas más finas si
+                difiere del orden formal en menos de 'ORDER_TOL' (relativo), o el orden formal si
+                no (p_R fuera del rango asintótico o contaminado por el ruido de la solución)
+
+Con cheapest se elige, para cada esquema, la malla más barata (menos nodos) cuyo error cumple una
+tolerancia; si ninguna la cumple se estima el número de nodos con el orden observado. Sin
+solución analítica el error estimado se multiplica por un factor de seguridad como en el GCI de
+Roache: 1.25 si p_R coincide con el orden formal y 3 si no. Las comparaciones entre mallas se
+hacen en las caras interiores de la más gruesa, que son caras de todas las mallas de la
+escalera, interpolando linealmente entre los centros de cada malla. El error de interpolación de
+cada malla es O(h^2) con su propio h, así que se suma al error de discretización como un término
+de segundo orden más: no cambia el orden de los esquemas de orden 1 y 2 en el rango asintótico,
+pero sí el coeficiente del error y, en mallas gruesas, el orden observado.
+"""
+
+import numpy as np
+from Mesh import Mesh
+from Sweep import advective, runSweep
+from Timer import timed
+
+NORMS = ('L1', 'L2', 'Linf')
+# Orden formal de cada esquema advectivo (con difusión centrada de segundo orden)
+ORDER = {'Upwind1': 1, 'Upwind2': 2, 'DifCentrales': 2, 'Quick': 2}
+ORDER_TOL = 0.1
+
+def ladder(case, levels = 5, refine = 2):
+    """
+    Regresa la lista de casos con 'levels' mallas: la primera con los nodos del caso y cada
+    siguiente con 'refine' veces más volúmenes.
+    """
+    cells = case['nodes'] - 1
+    return [dict(case, nodes = cells * refine**k + 1) for k in range(levels)]
+
+def faces(case):
+    # Coordenadas de las caras de la malla del caso
+    malla = Mesh(nodes = case['nodes'], length = case['length'],
+                 stretching = case.get('stretching'), ratio = case.get('ratio', 1.0))
+    return malla.faces()
+
+def norms(error, dx):
+    """
+    Normas L1, L2 y Linf (pesadas con el tamaño de los volúmenes) del error en los volúmenes
+    interiores. 'error' tiene nvx valores (incluyendo fronteras) y dx los nvx-2 tamaños.
+    """
+    e = np.abs(error[1:-1])
+    L = np.sum(dx)
+    return {'L1': np.sum(e * dx) / L, 'L2': np.sqrt(np.sum(e**2 * dx) / L), 'Linf': np.max(e)}
+
+def order(coarse, fine, r):
+    # Orden observado a partir de dos errores (o dos diferencias) con razón de refinamiento r
+    if coarse > 0 and fine > 0:
+        return np.log(coarse / fine) / np.log(r)
+    return np.nan
+
+def estimationOrder(p_R, formal, tol = ORDER_TOL):
+    """
+    Orden para extrapolar: regresa (p, True) con el orden observado p_R si difiere del formal en
+    menos de tol (relativo), o (formal, False) si no (o si p_R no es positivo).
+    """
+    if p_R > 0 and abs(p_R - formal) <= tol * formal:
+        return p_R, True
+    return formal, False
+
+def richardson(phi_f, phi_c, p, r):
+    """
+    Extrapolación de Richardson: phi_f + (phi_f - phi_c) / (r^p - 1), con phi_c y phi_f en los
+    mismos puntos.
+    """
+    return phi_f + (phi_f - phi_c) / (r**p - 1)
+
+@timed()
+def study(case, levels = 5, refine = 2, metodos = ('Upwind1', 'Upwind2', 'DifCentrales', 'Quick'),
+          workers = None):
+    """
+    Resuelve el caso en la escalera de mallas para cada esquema (todas en paralelo) y regresa una
+    tabla (diccionario de columnas, que acepta pandas.DataFrame) con un renglón por malla y esquema:
+    metodo, nodes, h, L1, L2, Linf, p_L1, p_L2, p_Linf, p_R, Richardson, Extrapolado (norma L2 del
+    error de la solución extrapolada, si hay solución analítica), Estimado, p_formal, p_Estimado y
+    Tiempo.
+    """
+    cases = [c for metodo in metodos for c in ladder(dict(case, metodo = metodo), levels, refine)]
+    results = runSweep(cases, workers = workers)
+    analytic = case.get('analytic')
+    table = {}
+    for i, metodo in enumerate(metodos):
+        formal = ORDER.get(metodo, 1) if advective(case) else 2
+        rows = range(i * levels, (i + 1) * levels)
+        xs = [results['x'][j] for j in rows]
+        phis = [results['phi'][j] for j in rows]
+        fs = [faces(cases[j]) for j in rows]
+        errors = []
+        table_rows = []
+        for k, j in enumerate(rows):
+            row = {'metodo': metodo, 'nodes': cases[j]['nodes'],
+                   'h': case['length'] / (cases[j]['nodes'] - 1)}
+            errors.append(norms(phis[k] - analytic(xs[k], case), np.diff(fs[k])) if analytic else
+                          dict.fromkeys(NORMS, np.nan))
+            row.update(errors[k])
+            for norm in NORMS:
+                row['p_' + norm] = np.nan if k == 0 else \
+                    order(errors[k-1][norm], errors[k][norm], refine)
+            row['p_R'] = np.nan
+            row['Richardson'] = np.nan
+            row['Extrapolado'] = np.nan
+            if k >= 2:
+                # Tres mallas comparadas en las caras de la más gruesa (con las fronteras, que
+                # norms no toma en cuenta); el peso de cada cara es la distancia entre centros.
+                # El error de interpolación de cada malla escala con su propio h^2
+                x = fs[k-2]
+                dx = np.diff(xs[k-2])[1:-1]
+                c, m, f = [np.interp(x, xs[n], phis[n]) for n in (k - 2, k - 1, k)]
+                d1 = norms(m - c, dx)['L2']
+                d2 = norms(f - m, dx)['L2']
+                p = order(d1, d2, refine)
+                row['p_R'] = p
+                if p > 0:
+                    row['Richardson'] = d2 / (refine**p - 1)
+                    if analytic:
+                        extrapolated = richardson(f, m, p, refine)
+                        row['Extrapolado'] = norms(extrapolated - analytic(x, case), dx)['L2']
+            row['Tiempo'] = results['Tiempo'][j]
+            table_rows.append(row)
+        # Error de cada malla contra la extrapolación de las tres más finas (en las caras de la
+        # más gruesa de esas tres; si p_R no coincide con el orden formal se extrapola con el
+        # formal). El error se mide en los centros de cada malla con un spline cúbico de la
+        # extrapolación: al interpolar linealmente las soluciones a las caras se cancela la
+        # componente par-impar del error (QUICK) y el error se subestima varias veces
+        p = np.nan
+        extrapolated = None
+        if levels >= 3:
+            from scipy.interpolate import CubicSpline
+            p = estimationOrder(table_rows[-1]['p_R'], formal)[0]
+            x = fs[-3]
+            extrapolated = CubicSpline(x, richardson(np.interp(x, xs[-1], phis[-1]),
+                                                     np.interp(x, xs[-2], phis[-2]), p, refine))
+        for k, row in enumerate(table_rows):
+            row['Estimado'] = np.nan if extrapolated is None else \
+                norms(phis[k] - extrapolated(xs[k]), np.diff(fs[k]))['L2']
+            row['p_formal'] = formal
+            row['p_Estimado'] = p
+            for key, value in row.items():
+                table.setdefault(key, []).append(value)
+    return table
+
+def cheapest(table, target, norm = 'L2', safety = 1.25, fallbackSafety = 3.0):
+    """
+    Para cada esquema de la tabla de study regresa {'nodes', 'error', 'predicted'}: la malla con
+    menos nodos cuyo error (norma 'norm', o la columna Estimado multiplicada por un factor de
+    seguridad si no hay solución analítica, como en el GCI de Roache) es menor o igual que
+    'target'. El factor es 'safety' si p_R coincide con el orden formal y 'fallbackSafety' si no.
+    Si ninguna malla lo cumple se extrapola con el último orden observado (con p_Estimado sin
+    solución analítica; predicted = True); si el orden no es positivo regresa None para ese
+    esquema.
+    """
+    suggestions = {}
+    for metodo in dict.fromkeys(table['metodo']):
+        rows = [i for i, m in enumerate(table['metodo']) if m == metodo]
+        rows.sort(key = lambda i: table['nodes'][i])
+        last = rows[-1]
+        analytic = not np.isnan(table[norm][last])
+        key = norm if analytic else 'Estimado'
+        if analytic:
+            factor = 1.0
+            p = table['p_' + norm][last]
+        else:
+            p, consistent = estimationOrder(table['p_R'][last], table['p_formal'][last])
+            factor = safety if consistent else fallbackSafety
+        suggestions[metodo] = None
+        for i in rows:
+            error = factor * table[key][i]
+            if error <= target:
+                suggestions[metodo] = {'nodes': table['nodes'][i], 'error': float(error),
+                                       'predicted': False}
+                break
+        else:
+            if p > 0 and not np.isnan(table[key][last]):
+                cells = table['nodes'][rows[-1]] - 1
+                cells = int(np.ceil(cells * (factor * table[key][rows[-1]] / target)**(1 / p)))
+                suggestions[metodo] = {'nodes': cells + 1, 'error': target, 'predicted': True}
+    return suggestions
+
+if __name__ == '__main__':
+
+    from pandas import DataFrame
+    from Sweep import analyticAdvDiff
+
+    # Ejemplo 5.1 de Malalasekera con u = 2.5 (Pe = 25)
+    case = {'nodes': 11, 'length': 1.0, 'Gamma': 0.1, 'rho': 1.0, 'u': 2.5,
+            'bc': {'LEFT_WALL': ('DIRICHLET', 1.0), 'RIGHT_WALL': ('DIRICHLET', 0.0)},
+            'analytic': analyticAdvDiff}
+    table = study(case, levels = 6)
+    columns = ['metodo', 'nodes', 'L2', 'Linf', 'p_L2', 'p_R', 'Richardson', 'Extrapolado',
+               'Estimado', 'p_Estimado']
+    print(DataFrame(table)[columns].to_string(float_format = '%.3e'))
+    # La estimación sin solución analítica en la malla más fina está cerca del error real
+    finest = [i for i, n in enumerate(table['nodes']) if n == max(table['nodes'])]
+    for i in finest:
+        assert 0.67 < table['Estimado'][i] / table['L2'][i] < 1.5, table['metodo'][i]
+    print('-' * 20)
+    exact = cheapest(table, 1e-4)
+    for metodo, suggestion in exact.items():
+        print(metodo, suggestion)
+    print('-' * 20)
+
+    # Sin solución analítica el error se estima con Richardson
+    case.pop('analytic')
+    table = study(case, levels = 6, metodos = ('Upwind1', 'Quick'))
+    for metodo, suggestion in cheapest(table, 1e-4).items():
+        print(metodo, suggestion)
+        # Con el factor de seguridad la malla sugerida no es más gruesa que la necesaria
+        assert suggestion['nodes'] >= exact[metodo]['nodes']
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import numpy as np
 from Coefficients import Coefficients
+from Timer import timed
 
 class Diffusion1D(Coefficients):
     """
@@ -9,46 +11,103 @@ class Diffusion1D(Coefficients):
     (aP, aW,aE). Esta clase hereda de la clase Coefficients.
     
     Métodos:
-        constructor(nvx,Gamma,dx): inicia los atributos nvx y dx de acuerdo a la clase padre además del
-                                   atributo Gamma
+        constructor(nvx,Gamma,dx,coef,interpolation): inicia los atributos nvx y dx de acuerdo a la clase
+                                        padre además del atributo Gamma. Si se da 'coef' (objeto
+                                        Coefficients) los coeficientes se acumulan en los arreglos
+                                        de ese objeto. 'interpolation' ('harmonic' o 'arithmetic')
+                                        indica cómo se pasa Gamma de los volúmenes a las caras
         destructor(): delete atributes
         calcCoef(): Calcula los coeficientes difusivos y actualiza los coficientes generales (aP, aW,aE).
+        setGamma(Gamma): set Gamma
+        Gamma(): get Gamma
+        faceGamma(): regresa Gamma en las caras
 
         
     Atributos:
         aP: Coeficiente central
         aE: Coeficiente de nodo siguiente
         aW: Coeficiente de nodo anterior
-        Gamma: Coeficiente Difussivo
-        dx: tamaño del los volumenes
+        Gamma: Coeficiente Difussivo. Puede ser un escalar, un arreglo por volumen (nvx valores,
+               incluyendo las fronteras) o un arreglo por cara (nvx-1 valores)
+        interpolation: interpolación de Gamma a las caras ('harmonic' o 'arithmetic')
+        dx: tamaño del los volumenes (escalar o un arreglo con el tamaño de cada volumen en mallas
+            no uniformes; ver Mesh.delta)
         
     """
     
-    def __init__(self, nvx = None, Gamma = None, dx = None):
-        super().__init__(nvx, dx)
+    def __init__(self, nvx = None, Gamma = None, dx = None, coef = None, interpolation = 'harmonic'):
+        super().__init__(nvx, dx, coef)
         self.__nvx = nvx
         self.__Gamma = Gamma
         self.__dx = dx
+        self.__interpolation = interpolation
 
     def __del__(self):
         del(self.__Gamma)
         del(self.__dx)
     
+    def setGamma(self, Gamma):
+        self.__Gamma = Gamma
+
+    def Gamma(self):
+        return self.__Gamma
+
+    def faceGamma(self):
+        """
+        Regresa Gamma en las caras. Si Gamma es un arreglo por volumen se interpola a las caras
+        (media armónica o aritmética, pesada con el tamaño de los volúmenes); en las caras de la
+        frontera se usa el valor de la frontera. Si es un escalar (o uno por caso) o ya está dado
+        en las caras se regresa tal cual.
+        """
+        Gamma = self.__Gamma
+        if np.shape(Gamma)[-1:] != (self.__nvx,):
+            return Gamma
+        dx = np.broadcast_to(self.__dx, np.shape(Gamma)) if np.shape(self.__dx)[-1:] == (self.__nvx,) \
+             else np.ones(np.shape(Gamma))
+        GL, GR = Gamma[...,:-1], Gamma[...,1:]
+        dL, dR = dx[...,:-1], dx[...,1:]
+        if self.__interpolation == 'arithmetic':
+            Gf = (dR * GL + dL * GR) / (dL + dR)
+        else:
+            Gf = (dL + dR) / (dL / GL + dR / GR)
+        Gf[...,0] = Gamma[...,0]
+        Gf[...,-1] = Gamma[...,-1]
+        return Gf
+
+    @timed()
     def calcCoef(self):
         #obtiene los coeficientes usando los geters
         aE = self.aE()
         aW = self.aW()
         aP = self.aP()
-        
-        #actualiza los coeficientes (Si gamma no es constante se deben descomentar las siguientes líneas y comentar estas)
-        aE += self.__Gamma / self.__dx
-        aW += self.__Gamma / self.__dx
-        aP += aE + aW
- 
-#        for i in range(self.__nvx):
-#            aE[i] += self.__Gamma / self.__dx
-#            aW[i] += self.__Gamma / self.__dx
-#            aP[i] += aE[i] + aW[i]
+
+        Gamma = self.faceGamma()
+        dx = self.__dx
+        if np.ndim(Gamma) == 0 or np.shape(Gamma)[-1] == 1:
+            if np.shape(dx)[-1:] != (self.__nvx,):
+                # Gamma y dx constantes: el mismo coeficiente en todos los volúmenes
+                aE += Gamma / dx
+                aW += Gamma / dx
+                aP += 2 * Gamma / dx
+                return
+
+        if np.shape(dx)[-1:] == (self.__nvx,):
+            # Malla no uniforme: distancia entre centros vecinos a partir del tamaño de los volúmenes.
+            # En las fronteras resulta el tamaño del primer/último volumen, que es la distancia que
+            # supone bcDirichlet al duplicar el coeficiente.
+            d = 0.5 * (dx[...,:-1] + dx[...,1:])
+        else:
+            d = dx
+        # Conductancia de cada cara (nvx-1 valores)
+        k = np.broadcast_to(Gamma / d, np.shape(aE)[:-1] + (self.__nvx - 1,))
+        aE[...,:-1] += k
+        aE[...,-1] += k[...,-1]
+        aW[...,1:] += k
+        aW[...,0] += k[...,0]
+        aP[...,:-1] += k
+        aP[...,-1] += k[...,-1]
+        aP[...,1:] += k
+        aP[...,0] += k[...,0]
 
 if __name__ == '__main__':
     
@@ -65,3 +124,11 @@ if __name__ == '__main__':
     df1.bcDirichlet('RIGHT_WALL', 1)
     print(df1.aP(), df1.aE(), df1.aW(), df1.Su(), sep = '\n')
     print('-' * 20)  
+
+    # Barra con dos materiales: Gamma por volumen interpolado a las caras
+    Gamma = np.array([1., 1., 1., 10., 10.])
+    df2 = Diffusion1D(5, Gamma, 1)
+    df2.alloc(5)
+    df2.calcCoef()
+    print(df2.faceGamma(), df2.aP(), df2.aE(), df2.aW(), sep = '\n')
+    print('-' * 20)  
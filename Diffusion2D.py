@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Coefficients2D import Coefficients2D
+from Timer import timed
+
+class Diffusion2D(Coefficients2D):
+    """
+    Clase que calcula los coeficientes difusivos en 2D y actualiza los coeficientes generales
+    (aP, aE, aW, aN, aS). Hereda de Coefficients2D. Todas las caras se calculan de una vez con
+    operaciones sobre arreglos: las caras en x forman un arreglo (ny, nx+1) y las caras en y uno
+    (ny+1, nx), incluyendo las caras de la frontera (con la distancia del centro a la cara).
+
+        k = Gamma_cara * área / distancia entre centros
+
+    Métodos:
+        constructor(nx,ny,Gamma,dx,dy,coef): número y tamaño de los volúmenes, coeficiente difusivo
+                  (escalar o uno por volumen, (ny, nx)) y objeto Coefficients2D a compartir
+        setGamma(Gamma): set Gamma
+        Gamma(): get Gamma
+        faceGamma(): regresa Gamma en las caras en x (ny, nx+1) y en y (ny+1, nx), con media
+                     armónica pesada con el tamaño de los volúmenes
+        calcCoef(): calcula los coeficientes difusivos y los suma a los generales
+
+    Atributos:
+        Gamma: coeficiente difusivo
+    """
+
+    def __init__(self, nx = None, ny = None, Gamma = None, dx = None, dy = None, coef = None):
+        super().__init__(nx, ny, dx, dy, coef)
+        self.__Gamma = Gamma
+
+    def setGamma(self, Gamma):
+        self.__Gamma = Gamma
+
+    def Gamma(self):
+        return self.__Gamma
+
+    def faceGamma(self):
+        G = self.__Gamma
+        if np.ndim(G) == 0:
+            return G, G
+        dx = self.dx()
+        dy = self.dy()
+        Gx = np.empty((self.ny(), self.nx() + 1))
+        Gx[:,1:-1] = (dx[:,:-1] + dx[:,1:]) / (dx[:,:-1] / G[:,:-1] + dx[:,1:] / G[:,1:])
+        Gx[:,0] = G[:,0]
+        Gx[:,-1] = G[:,-1]
+        Gy = np.empty((self.ny() + 1, self.nx()))
+        Gy[1:-1] = (dy[:-1] + dy[1:]) / (dy[:-1] / G[:-1] + dy[1:] / G[1:])
+        Gy[0] = G[0]
+        Gy[-1] = G[-1]
+        return Gx, Gy
+
+    @timed()
+    def calcCoef(self):
+        aP = self.aP()
+        aE = self.aE()
+        aW = self.aW()
+        aN = self.aN()
+        aS = self.aS()
+        dx = self.dx()[0]
+        dy = self.dy()[:,0]
+        Gx, Gy = self.faceGamma()
+
+        # Distancia entre centros en cada cara (en la frontera, del centro a la cara)
+        hx = np.concatenate(([dx[0] / 2], 0.5 * (dx[:-1] + dx[1:]), [dx[-1] / 2]))
+        hy = np.concatenate(([dy[0] / 2], 0.5 * (dy[:-1] + dy[1:]), [dy[-1] / 2]))
+        kx = Gx * dy[:,None] / hx[None,:]
+        ky = Gy * dx[None,:] / hy[:,None]
+
+        aW += kx[:,:-1]
+        aE += kx[:,1:]
+        aS += ky[:-1]
+        aN += ky[1:]
+        aP += kx[:,:-1] + kx[:,1:] + ky[:-1] + ky[1:]
+
+if __name__ == '__main__':
+
+    df = Diffusion2D(4, 3, Gamma = 1.0, dx = 0.25, dy = 1/3)
+    df.alloc()
+    df.calcCoef()
+    print(df.aP(), df.aE(), df.aN(), sep = '\n')
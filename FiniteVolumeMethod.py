@@ -5,22 +5,39 @@ Módulo que importa todas las funciones, clases, etcétera, necesarios en el mé
 
 """
 import numpy as np
-from pandas import DataFrame
 from Mesh import Mesh
 from Coefficients import Coefficients
 from Diffusion import Diffusion1D
 from Advection import Advection1D
 from Matrix import Matrix
+from Batch import Batch1D
+from Mesh2D import Mesh2D
+from Coefficients2D import Coefficients2D
+from Diffusion2D import Diffusion2D
+from Advection2D import Advection2D
+from Matrix2D import Matrix2D
+from Sweep import grid, runSweep, solveCase
+from Convergence import ladder, study, cheapest
+from Transient import TimeIntegrator, TimeController, precisionError
+from Solvers import IterativeSolver
+from Nonlinear import NonlinearSolver
+from Multigrid import Multigrid
+from Output import SnapshotWriter, loadSnapshots, Checkpoint, latestCheckpoint, restart
+from Operators import Operator, OperatorCache
+from Kernels import setBackend, backend
+from Timer import Timers, TIMERS, region, timed, count
 import time
 
 def crono(f):
  	"""
- 	Regresa el tiempo que toma en ejecutarse la funcion.
+ 	Regresa el tiempo que toma en ejecutarse la funcion. Acepta cualquier argumento y, si los
+ 	cronómetros están activos (ver Timer), la llamada también se registra como una región.
  	"""
- 	def eTime(A,b):
- 		t1 = time.time()
- 		f(A,b)
- 		t2 = time.time()
+ 	def eTime(*args, **kargs):
+ 		t1 = time.perf_counter()
+ 		with region(f.__qualname__):
+ 			f(*args, **kargs)
+ 		t2 = time.perf_counter()
  		return 'Elapsed time: ' + str((t2 - t1)) + "\n"
  	return eTime
 
@@ -41,7 +58,10 @@ def printData(**kargs):
 	for (key,value) in kargs.items():
 		print('|{:^70}|'.format('{0:>15s} = {1:10.5e}'.format(key, value)))
 
+@timed('output')
 def printFrame(d):
+    # pandas sólo se carga cuando se imprime una tabla
+    from pandas import DataFrame
     # Calculo el error porcentual y agrego al DataFrame
     # una columna con esos datos llamada 'Error %'
     d['Error %'] = d['Error'] / d['Analytic'] 
@@ -53,11 +73,12 @@ def calcError(phiA, phiN):
         
 if __name__ == '__main__':
  
-    Coefficients.alloc(5)
     m = Mesh(nodes = 5)
-    d = Diffusion1D(m.volumes())
+    c = Coefficients(m.volumes())
+    c.alloc(m.volumes())
+    d = Diffusion1D(m.volumes(), coef = c)
     ma = Matrix(m.volumes())
-    a = Advection1D(m.volumes())
+    a = Advection1D(m.volumes(), coef = c)
 
     print(m.delta(), d.aP(), a.aP(), ma.mat(), sep='\n')
 
@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo con kernels compilados (numba) para los ciclos que no se vectorizan bien: los
+coeficientes advectivos con el cambio de signo del flujo en cada cara (Advection1D.calcCoef), la
+actualización explícita (TimeIntegrator con 'Forward') y el algoritmo de Thomas de los barridos
+TDMA (IterativeSolver). Los kernels se escriben como ciclos de Python y se compilan con
+numba.njit la primera vez que se piden; numba es opcional y sólo se importa en ese momento.
+
+El backend se elige con la variable de ambiente FVM_BACKEND o en tiempo de ejecución con
+setBackend:
+    'numba': kernels compilados (si numba no está instalado se usa 'numpy')
+    'numpy': las versiones vectorizadas de cada módulo (kernel() regresa None)
+    'python': los mismos ciclos sin compilar; es lento, sirve para comprobar los kernels sin numba
+Sin FVM_BACKEND se usa 'numba' si está instalado y 'numpy' si no.
+
+Los kernels hacen las mismas operaciones en el mismo orden que las versiones vectorizadas, así
+que los coeficientes advectivos y la actualización explícita son idénticos bit a bit. Thomas no
+pivotea, a diferencia de scipy.linalg.solve_banded, y coincide con él hasta el redondeo.
+"""
+
+import os
+import importlib.util
+import numpy as np
+
+# Códigos de los esquemas advectivos (numba compila mejor enteros que cadenas)
+SCHEMES = {'DifCentrales': 0, 'Upwind1': 1, 'Upwind2': 2, 'Quick': 3}
+
+def advectionLoop(metodo, rho, u, ge, gw, aP, aE, aW, aEE, aWW):
+    """
+    Suma los coeficientes advectivos a aP, aE, aW, aEE y aWW (nvx valores, sólo se modifican los
+    interiores). u tiene las velocidades en las caras (nvx-1 valores) y ge, gw los pesos de
+    'DifCentrales' de cada volumen interior (ver advectiveCoef).
+    """
+    for i in range(1, aP.size - 1):
+        Fe = rho * u[i]
+        Fw = rho * u[i-1]
+        CEE = 0.
+        CWW = 0.
+        if metodo == 0:
+            CE = - Fe * ge[i-1]
+            CW =   Fw * gw[i-1]
+        else:
+            Fep = max(Fe, 0.)
+            Fen = max(-Fe, 0.)
+            Fwp = max(Fw, 0.)
+            Fwn = max(-Fw, 0.)
+            if metodo == 1:
+                CE = Fen
+                CW = Fwp
+            elif metodo == 2:
+                CE = 1.5*Fen + 0.5*Fwn
+                CW = 1.5*Fwp + 0.5*Fep
+                CEE = -0.5*Fen
+                CWW = -0.5*Fwp
+            else:
+                CE = (-3./8.)*Fep + (6./8.)*Fen + (1./8.)*Fwn
+                CW = (1./8.)*Fep + (6./8.)*Fwp + (-3./8.)*Fwn
+                CEE = -(1./8.)*Fen
+                CWW = -(1./8.)*Fwp
+        aE[i] += CE
+        aW[i] += CW
+        aEE[i] += CEE
+        aWW[i] += CWW
+        aP[i] += CE + CW + CEE + CWW + rho * (u[i] - u[i-1])
+
+def explicitLoop(p, Su, dWW, dW, dP, dE, dEE, c, r):
+    """
+    Un paso explícito p += c (Su - A p) con las diagonales de Matrix.diagonals; r es un arreglo
+    de trabajo de N valores.
+    """
+    N = p.size
+    for i in range(N):
+        s = Su[i] - dP[i] * p[i]
+        if i < N - 1:
+            s -= dE[i] * p[i+1]
+        if i > 0:
+            s -= dW[i-1] * p[i-1]
+        if i < N - 2:
+            s -= dEE[i] * p[i+2]
+        if i > 1:
+            s -= dWW[i-2] * p[i-2]
+        r[i] = s * c[i]
+    for i in range(N):
+        p[i] += r[i]
+
+def thomasLoop(a, b, c, d, x):
+    """
+    Algoritmo de Thomas para el sistema tridiagonal a[i] x[i-1] + b[i] x[i] + c[i] x[i+1] = d[i]
+    (a[0] y c[-1] no se usan). La solución se escribe en x.
+    """
+    n = d.size
+    cp = np.empty(n)
+    dp = np.empty(n)
+    cp[0] = c[0] / b[0]
+    dp[0] = d[0] / b[0]
+    for i in range(1, n):
+        m = b[i] - a[i] * cp[i-1]
+        cp[i] = c[i] / m
+        dp[i] = (d[i] - a[i] * dp[i-1]) / m
+    x[n-1] = dp[n-1]
+    for i in range(n - 2, -1, -1):
+        x[i] = dp[i] - cp[i] * x[i+1]
+
+LOOPS = {'advection': advectionLoop, 'explicit': explicitLoop, 'thomas': thomasLoop}
+
+# Kernels ya compilados
+KERNELS = {}
+
+def available():
+    # Sólo busca el paquete, sin importarlo
+    return importlib.util.find_spec('numba') is not None
+
+def setBackend(name = None):
+    """
+    Elige el backend ('numba', 'numpy' o 'python'; None para el automático). Regresa False si se
+    pidió 'numba' y no está instalado (en ese caso queda 'numpy').
+    """
+    global BACKEND
+    if name is None:
+        name = 'numba' if available() else 'numpy'
+    if name == 'numba' and not available():
+        BACKEND = 'numpy'
+        return False
+    BACKEND = name if name in ('numba', 'numpy', 'python') else 'numpy'
+    return BACKEND == name
+
+def backend():
+    return BACKEND
+
+def kernel(name):
+    """
+    Regresa el kernel 'name' del backend actual, o None con 'numpy' (el módulo que lo pide usa
+    entonces su versión vectorizada).
+    """
+    if BACKEND == 'python':
+        return LOOPS[name]
+    if BACKEND != 'numba':
+        return None
+    if name not in KERNELS:
+        from numba import njit
+        KERNELS[name] = njit(cache = True)(LOOPS[name])
+    return KERNELS[name]
+
+BACKEND = 'numpy'
+setBackend(os.environ.get('FVM_BACKEND'))
+
+if __name__ == '__main__':
+
+    import time
+    # El estado del backend es el del módulo que importan los demás, no el de __main__
+    from Kernels import setBackend
+    from Coefficients import Coefficients
+    from Advection import Advection1D
+    from Diffusion import Diffusion1D
+    from Transient import TimeIntegrator
+    from Solvers import IterativeSolver
+
+    # Se compara cada backend con las versiones vectorizadas de numpy
+    def problem(nvx, metodo):
+        coef = Coefficients(nvx, 1.0 / (nvx - 2))
+        coef.alloc(nvx)
+        Diffusion1D(nvx, Gamma = 0.1, dx = 1.0 / (nvx - 2), coef = coef).calcCoef()
+        adv = Advection1D(nvx, rho = 1.0, dx = 1.0 / (nvx - 2), coef = coef)
+        adv.setU(np.sin(np.linspace(0, 6, nvx - 1)))
+        t1 = time.perf_counter()
+        adv.calcCoef(metodo)
+        t2 = time.perf_counter()
+        coef.bcDirichlet('LEFT_WALL', 1.0)
+        coef.bcDirichlet('RIGHT_WALL', 0.0)
+        return coef, t2 - t1
+
+    def run(nvx):
+        results = {}
+        for metodo in SCHEMES:
+            coef, results[metodo] = problem(nvx, metodo)
+            results[metodo + ' aP'] = coef.aP().copy()
+        coef = problem(nvx, 'Upwind1')[0]
+        integ = TimeIntegrator(coef, rho = 1.0, dx = 1.0 / (nvx - 2), dt = 1e-7,
+                               phi = np.zeros(nvx))
+        t1 = time.perf_counter()
+        results['phi'] = integ.step(100).copy()
+        results['Forward'] = time.perf_counter() - t1
+        solver = IterativeSolver('TDMA', tol = 1e-10, maxiter = 200)
+        t1 = time.perf_counter()
+        results['x'] = solver.solve(coef)
+        results['TDMA'] = time.perf_counter() - t1
+        return results
+
+    print('numba instalado:', available())
+    for name, nvx in (('numba', 100002), ('python', 2002)):
+        if not setBackend(name):
+            continue
+        if name == 'numba':
+            run(12)  # compilación
+        results = run(nvx)
+        setBackend('numpy')
+        ref = run(nvx)
+        print('Backend', name, 'nvx =', nvx)
+        for metodo in SCHEMES:
+            print('  %-12s diferencia = %.1e  tiempo = %.4f s (numpy %.4f s)' %
+                  (metodo, np.max(np.abs(results[metodo + ' aP'] - ref[metodo + ' aP'])),
+                   results[metodo], ref[metodo]))
+        print('  %-12s diferencia = %.1e  tiempo = %.4f s (numpy %.4f s)' %
+              ('Forward', np.max(np.abs(results['phi'] - ref['phi'])), results['Forward'],
+               ref['Forward']))
+        print('  %-12s diferencia = %.1e  tiempo = %.4f s (numpy %.4f s)' %
+              ('TDMA', np.max(np.abs(results['x'] - ref['x'])), results['TDMA'], ref['TDMA']))
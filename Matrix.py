@@ -2,6 +2,10 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
+from Timer import timed
+
+# scipy se importa en el primer uso (modos 'banded' y 'sparse') para que importar el paquete
+# sólo cargue numpy
 
 class Matrix():
     """
@@ -9,21 +13,49 @@ class Matrix():
     la ecuación discreta del método de volumen finito. Para más información de los coeficientes revisar las
     clases Advection, Coefficients y Difusion.
     
+    La matriz puede almacenarse completa ('dense', N x N) o por bandas ('banded'). En el modo por
+    bandas sólo se guardan las cinco diagonales en un arreglo de 5 x N con el formato de
+    scipy.linalg.solve_banded, de modo que la memoria y la solución son O(N). Con el argumento 'cases'
+    el modo 'banded' guarda varios sistemas independientes (coeficientes de forma (cases, nvx)) y
+    los resuelve todos en una sola llamada como un sistema con bloques en la diagonal. En el modo 'sparse' la
+    matriz se ensambla directamente en formato CSR (scipy.sparse) a partir de las diagonales, lista
+    para usarse con los solvers de scipy.sparse.linalg.
+    
     Métodos:
-        constructor(nvx): set matriz A y tamaño N de la matriz
+        constructor(nvx,storage,cases,dtype): set matriz A, tamaño N de la matriz, tipo de
+                                        almacenamiento ('dense', 'banded' o 'sparse'), número de
+                                        casos apilados (sólo 'banded') y tipo de punto flotante (en
+                                        'sparse' la matriz toma el tipo de los coeficientes)
         destructor(): delete atributes N y matriz A
-        mat(): get matriz A
+        mat(): get matriz A (en el modo 'banded' regresa el arreglo de 5 x N con las diagonales y
+               en el modo 'sparse' una matriz CSR)
+        storage(): get tipo de almacenamiento
         build(coefficients): construye la matriz A(pentadiagonal)
+        solve(b): resuelve el sistema A x = b (b de forma (cases, N) si hay varios casos; sin
+                  casos apilados b puede ser un bloque (N, k) de k lados derechos)
+        diagonals(coefficients): regresa las cinco diagonales (aWW, aW, aP, aE, aEE) del sistema
        
     Atributos:
         A: matriz que representa el sistema de ecuaciones a resolver.
         N: tamaño de la matriz
+        cases: número de casos apilados (None si sólo hay uno)
+        storage: tipo de almacenamiento ('dense', 'banded' o 'sparse')
 
     """
     
-    def __init__(self, nvx = None):
+    def __init__(self, nvx = None, storage = 'dense', cases = None, dtype = float):
         self.__N = nvx - 2 
-        self.__A = np.eye(self.__N)
+        self.__storage = storage
+        self.__cases = cases
+        if storage == 'banded':
+            shape = (5, self.__N) if cases is None else (5, cases, self.__N)
+            self.__A = np.zeros(shape, dtype = dtype)
+            self.__A[2] = 1
+        elif storage == 'sparse':
+            from scipy.sparse import diags
+            self.__A = diags(np.ones(self.__N, dtype = dtype), 0, format = 'csr')
+        else:
+            self.__A = np.eye(self.__N, dtype = dtype)
 
     def __del__(self):
         del(self.__N)
@@ -32,7 +64,30 @@ class Matrix():
     def mat(self):
         return self.__A
     
+    def storage(self):
+        return self.__storage
+    
+    @staticmethod
+    def diagonals(coefficients):
+        """
+        Regresa las diagonales (inferior 2, inferior 1, principal, superior 1, superior 2) de la
+        matriz, cada una con la longitud que le corresponde (N-2, N-1, N, N-1, N-2).
+        """
+        aP = coefficients.aP()
+        aE = coefficients.aE()
+        aW = coefficients.aW()
+        aEE = coefficients.aEE()
+        aWW = coefficients.aWW()
+        return (-aWW[...,3:-1], -aW[...,2:-1], aP[...,1:-1], -aE[...,1:-2], -aEE[...,1:-3])
+    
+    @timed()
     def build(self, coefficients = None):
+        if self.__storage == 'banded':
+            self.__buildBanded(coefficients)
+            return
+        elif self.__storage == 'sparse':
+            self.__buildSparse(coefficients)
+            return
 # nx = 5, nvx = 6
 # 0     1     2     3     4     5  <-- Volumes 
 # o--|--x--|--x--|--x--|--x--|--o
@@ -74,6 +129,45 @@ class Matrix():
         A[-2][-3] = -aW[-3]
         A[-2][-4] = -aWW[-3]
 
+    def __buildBanded(self, coefficients):
+# Formato de solve_banded con dos diagonales arriba y dos abajo: A[2 + i - j, j] = a[i, j]
+#
+#      [[ *    *   -aEE -aEE]    <-- superior 2
+#       [ *   -aE  -aE  -aE ]    <-- superior 1
+#       [ aP   aP   aP   aP ]    <-- principal
+#       [-aW  -aW  -aW   *  ]    <-- inferior 1
+#       [-aWW -aWW  *    *  ]]   <-- inferior 2
+        dWW, dW, dP, dE, dEE = Matrix.diagonals(coefficients)
+        A = self.__A
+        A.fill(0)
+        A[0][...,2:] = dEE
+        A[1][...,1:] = dE
+        A[2] = dP
+        A[3][...,:-1] = dW
+        A[4][...,:-2] = dWW
+
+    def __buildSparse(self, coefficients):
+        # Las cinco diagonales se pasan de una sola vez a scipy.sparse (sin matriz densa intermedia)
+        from scipy.sparse import diags
+        N = self.__N
+        self.__A = diags(Matrix.diagonals(coefficients), [-2, -1, 0, 1, 2],
+                         shape = (N, N), format = 'csr')
+
+    @timed()
+    def solve(self, b):
+        if self.__storage == 'banded':
+            from scipy.linalg import solve_banded
+            if self.__cases is not None:
+                # Cada caso deja ceros en las esquinas de su bloque, así que al concatenarlos se
+                # obtiene un solo sistema por bandas con bloques desacoplados
+                x = solve_banded((2, 2), self.__A.reshape(5, -1), np.ravel(b))
+                return x.reshape(self.__cases, self.__N)
+            return solve_banded((2, 2), self.__A, b)
+        elif self.__storage == 'sparse':
+            from scipy.sparse.linalg import spsolve
+            return spsolve(self.__A, b)
+        return np.linalg.solve(self.__A, b)
+
 if __name__ == '__main__':
 
     a = Matrix(6)
@@ -97,3 +191,15 @@ if __name__ == '__main__':
     a.build(df1)
     print(a.mat())
     print('-' * 20)  
+
+    b = Matrix(6, storage = 'banded')
+    b.build(df1)
+    print(b.mat())
+    print(a.solve(df1.Su()[1:-1]), b.solve(df1.Su()[1:-1]), sep = '\n')
+    print('-' * 20)  
+
+    c = Matrix(6, storage = 'sparse')
+    c.build(df1)
+    print(c.mat().toarray())
+    print(c.solve(df1.Su()[1:-1]))
+    print('-' * 20)  
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Timer import timed
+
+class Matrix2D():
+    """
+    Clase que construye la matriz dispersa del sistema en 2D a partir de los coeficientes de un
+    objeto Coefficients2D. Los volúmenes se numeran por renglones (k = j * nx + i), así que la
+    matriz tiene cinco diagonales: la principal (aP), +-1 (-aE, -aW) y +-nx (-aN, -aS). Las
+    diagonales se arman con operaciones sobre los arreglos (ny, nx), con ceros en los
+    acoplamientos con las fronteras (su efecto ya está en aP y Su), y se pasan de una vez a
+    scipy.sparse en formato CSR.
+
+    Métodos:
+        constructor(nx,ny): número de volúmenes en cada dirección
+        build(coef): construye la matriz
+        mat(): get matriz (CSR)
+        solve(b,solver,phi0): resuelve A phi = b (b de forma (ny, nx) o de nx*ny valores) y
+                  regresa phi con forma (ny, nx). Sin 'solver' se usa la solución directa de
+                  scipy.sparse.linalg.spsolve; con un objeto IterativeSolver de Krylov ('CG' para
+                  difusión pura, 'BiCGSTAB' o 'GMRES' con advección) se resuelve de forma iterativa
+                  empezando en phi0, lo que escala mejor en mallas grandes.
+
+    Atributos:
+        nx, ny: número de volúmenes
+        A: matriz dispersa
+    """
+
+    def __init__(self, nx = None, ny = None):
+        self.__nx = nx
+        self.__ny = ny
+        self.__A = None
+
+    def mat(self):
+        return self.__A
+
+    @timed()
+    def build(self, coef):
+        from scipy.sparse import diags
+        nx, ny = self.__nx, self.__ny
+        N = nx * ny
+        E = -coef.aE()
+        W = -coef.aW()
+        # Sin acoplamiento entre el último volumen de un renglón y el primero del siguiente
+        E[:,-1] = 0
+        W[:,0] = 0
+        self.__A = diags((-coef.aS()[1:].ravel(), W.ravel()[1:], coef.aP().ravel(),
+                          E.ravel()[:-1], -coef.aN()[:-1].ravel()),
+                         (-nx, -1, 0, 1, nx), shape = (N, N), format = 'csr')
+
+    @timed()
+    def solve(self, b, solver = None, phi0 = None):
+        b = np.ravel(b)
+        if solver is None:
+            from scipy.sparse.linalg import spsolve
+            x = spsolve(self.__A.tocsc(), b)
+        else:
+            x = solver.solveSystem(self.__A, b, None if phi0 is None else np.ravel(phi0))
+        return x.reshape(self.__ny, self.__nx)
+
+if __name__ == '__main__':
+
+    from Mesh2D import Mesh2D
+    from Coefficients2D import Coefficients2D
+    from Diffusion2D import Diffusion2D
+    from Advection2D import Advection2D
+    from Solvers import IterativeSolver
+
+    # Placa con T = 100 a la izquierda, 0 en los demás lados: solución en serie de Fourier
+    malla = Mesh2D(nodes = (41, 41), length = (1.0, 1.0))
+    nx, ny = malla.nx(), malla.ny()
+    dx, dy = malla.dx(), malla.dy()
+    coef = Coefficients2D(nx, ny, dx, dy)
+    coef.alloc()
+    dif = Diffusion2D(nx, ny, Gamma = 1.0, dx = dx, dy = dy, coef = coef)
+    dif.calcCoef()
+    coef.bcDirichlet('LEFT_WALL', 100)
+    for wall in ('RIGHT_WALL', 'BOTTOM_WALL', 'TOP_WALL'):
+        coef.bcDirichlet(wall, 0)
+    A = Matrix2D(nx, ny)
+    A.build(coef)
+    T = A.solve(coef.Su())
+    X, Y = malla.createMesh()
+    # sinh(n pi (1 - x)) / sinh(n pi) escrito con exponenciales para no desbordar
+    n = np.arange(1, 200, 2)[:,None,None]
+    Ta = np.sum(400 / (np.pi * n) * np.sin(n * np.pi * Y) * np.exp(-n * np.pi * X)
+                * (1 - np.exp(-2 * n * np.pi * (1 - X))) / (1 - np.exp(-2 * n * np.pi)), axis = 0)
+    # Lejos de las esquinas con T discontinua
+    lejos = (X > 0.2) & (Y > 0.2) & (Y < 0.8)
+    print('-' * 20)
+    print('Error máximo (directo) = ', np.max(np.abs(T - Ta)[lejos]))
+    cg = IterativeSolver('CG', tol = 1e-10, maxiter = 2000, precond = 'jacobi')
+    T2 = A.solve(coef.Su(), solver = cg)
+    print('CG: iteraciones = ', cg.iterations(), ' diferencia = ', np.max(np.abs(T2 - T)))
+    print('-' * 20)
+
+    # Advección-difusión con u = 1, v = 0.5 (upwind) y fuente uniforme
+    coef.alloc()
+    dif.calcCoef()
+    adv = Advection2D(nx, ny, rho = 1.0, dx = dx, dy = dy, coef = coef)
+    adv.setU(1.0, 0.5)
+    adv.calcCoef('Upwind1')
+    coef.setSu(1.0)
+    for wall in ('LEFT_WALL', 'BOTTOM_WALL'):
+        coef.bcDirichlet(wall, 0)
+    for wall in ('RIGHT_WALL', 'TOP_WALL'):
+        coef.bcNeumman(wall, 0)
+    A.build(coef)
+    bicg = IterativeSolver('BiCGSTAB', tol = 1e-10, maxiter = 2000, precond = 'ilu')
+    phi = A.solve(coef.Su(), solver = bicg)
+    print('BiCGSTAB: iteraciones = ', bicg.iterations(),
+          ' diferencia = ', np.max(np.abs(phi - A.solve(coef.Su()))))
+    print('-' * 20)
@@ -2,14 +2,23 @@
 # -*- coding: utf-8 -*-
 
 import numpy as np
+from Timer import timed
 
 class Mesh():
     """
     Clase que se encarga de definir la malla a partir de los datos geométrios de la misma como
     el número de nodos o la longitud.
     
+    La malla puede ser uniforme (por omisión) o no uniforme: con estiramiento geométrico
+    (stretching = 'geometric', cada volumen es 'ratio' veces el anterior; ratio < 1 concentra los
+    volúmenes a la derecha), agrupada cerca de las dos paredes (stretching = 'walls', distribución
+    tangente hiperbólica con parámetro 'ratio' > 0) o con las coordenadas de las caras dadas por el
+    usuario (faces). En las mallas no uniformes delta() regresa un arreglo con el tamaño de cada
+    volumen (nvx valores; los puntos de frontera toman el tamaño del volumen vecino), que es lo que
+    reciben Diffusion1D, Advection1D y Coefficients en el argumento dx/delta.
+    
     Métodos:
-        constructor(nodes,volumes,lenght): set inicial atributes
+        constructor(nodes,volumes,lenght,stretching,ratio,faces,dtype): set inicial atributes
         destructor(): delete atributes
         adjustNodesVolumes(nodes,volumnes): Si se tiene el número de nodos calcula el número de volumenes y si
         se tiene el número de volumenes calcula el número de nodos.
@@ -19,7 +28,10 @@ class Mesh():
         SetVolumes(volumes): set volumes 
         lenght(): get lenght
         calcDelta(): calcula la distancia de cada uno de los volumenes de la malla "delta X"
-        delta(): get delta
+        delta(): get delta (escalar en mallas uniformes, arreglo por volumen en las no uniformes)
+        faces(): get coordenadas de las caras (nodos) de la malla
+        uniform(): True si la malla es uniforme
+        dtype(): get tipo de punto flotante de los arreglos de la malla
         createMesh(): Construye la maya que contien los puntos donde se obtendrá la solución (incluyendo frontera)
         
     Atributos:
@@ -27,11 +39,28 @@ class Mesh():
         volumes: número de volumenes de la mallla
         length: longitud del segmento de recta correspondiente al dominio    
         delta: longitud de cada volumen 
+        stretching: tipo de estiramiento (None, 'geometric' o 'walls')
+        ratio: parámetro del estiramiento
+        faces: coordenadas de las caras (None en mallas uniformes)
+        dtype: tipo de punto flotante de delta (no uniforme) y de createMesh (float por omisión)
     """
     
     def __init__(self, nodes = None,  
                      volumes = None,
-                     length = None):
+                     length = None,
+                     stretching = None,
+                     ratio = 1.0,
+                     faces = None,
+                     dtype = float):
+        self.__stretching = stretching
+        self.__dtype = dtype
+        self.__ratio = ratio
+        self.__faces = None
+        if faces is not None:
+            faces = np.asarray(faces, dtype = float)
+            nodes = faces.size
+            length = faces[-1] - faces[0]
+            self.__faces = faces
         self.__nodes = nodes
         self.__volumes = volumes
         self.__length = length     
@@ -69,16 +98,66 @@ class Mesh():
         return self.__length
         
     def calcDelta(self):
-        if self.__length:
+        if not self.__length:
+            return
+        # Con 'geometric' y ratio = 1 la malla es uniforme; en 'walls' ratio = 1 es un parámetro
+        # válido de la tangente hiperbólica
+        if self.__faces is None and (self.__stretching == 'walls' or
+                                     (self.__stretching == 'geometric' and self.__ratio != 1.0)):
+            if self.__stretching == 'walls' and not self.__ratio > 0:
+                raise ValueError("stretching = 'walls' requiere ratio > 0")
+            self.__faces = self.__stretchedFaces()
+        if self.__faces is None:
             self.__delta = self.__length / (self.__nodes - 1)
+        else:
+            widths = np.diff(self.__faces)
+            self.__delta = np.empty(self.__volumes, dtype = self.__dtype)
+            self.__delta[1:-1] = widths
+            self.__delta[0] = widths[0]
+            self.__delta[-1] = widths[-1]
+
+    def __stretchedFaces(self):
+        L = self.__length
+        n = self.__nodes - 1 # número de volúmenes (sin fronteras)
+        r = self.__ratio
+        if self.__stretching == 'geometric':
+            widths = L * (r - 1) / (r**n - 1) * r**np.arange(n)
+            faces = np.zeros(n + 1)
+            faces[1:] = np.cumsum(widths)
+        else:
+            xi = np.linspace(0, 1, n + 1)
+            faces = 0.5 * L * (1 + np.tanh(r * (2 * xi - 1)) / np.tanh(r))
+        faces[0] = 0.0
+        faces[-1] = L
+        return faces
         
     def delta(self):
         return self.__delta
+
+    def faces(self):
+        if self.__faces is None:
+            return np.linspace(0, self.__length, self.__nodes)
+        return self.__faces
+
+    def uniform(self):
+        return self.__faces is None
+
+    def dtype(self):
+        return self.__dtype
     
+    @timed()
     def createMesh(self):
+        if self.__faces is not None:
+            # Centros de los volúmenes y las dos fronteras
+            f = self.__faces
+            self.__x = np.empty(self.__volumes, dtype = self.__dtype)
+            self.__x[1:-1] = 0.5 * (f[:-1] + f[1:])
+            self.__x[0] = f[0]
+            self.__x[-1] = f[-1]
+            return self.__x
         first_volume = self.__delta / 2
         final_volume = self.__length - first_volume
-        self.__x = np.zeros(self.__volumes)
+        self.__x = np.zeros(self.__volumes, dtype = self.__dtype)
         self.__x[1:-1] = np.linspace(first_volume,final_volume,self.__volumes-2)
         self.__x[-1] = self.__length
         return self.__x
@@ -128,5 +207,17 @@ if __name__ == '__main__':
     m1 = Mesh(volumes = 6, length = 1)
     print(m1.nodes(), m1.volumes(), m1.length(), m1.delta())
     m1.createMesh()
+    print('_' * 20)
+
+    m1 = Mesh(nodes = 6, length = 1, stretching = 'geometric', ratio = 0.7)
+    print(m1.faces(), m1.delta(), m1.createMesh(), sep = '\n')
+    print('_' * 20)
+
+    m1 = Mesh(nodes = 6, length = 1, stretching = 'walls', ratio = 2.0)
+    print(m1.faces(), m1.delta(), m1.createMesh(), sep = '\n')
+    print('_' * 20)
+
+    m1 = Mesh(faces = [0, 0.1, 0.3, 0.6, 1.0])
+    print(m1.nodes(), m1.volumes(), m1.length(), m1.delta(), m1.createMesh(), sep = '\n')
     print('_' * 20) 
     
\ No newline at end of file
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Mesh import Mesh
+from Timer import timed
+
+class Mesh2D():
+    """
+    Clase que define una malla estructurada en 2D como el producto de dos mallas 1D (objetos
+    Mesh), una en x y otra en y, así que cada dirección puede ser uniforme o no uniforme. A
+    diferencia del caso 1D, los arreglos 2D sólo tienen los volúmenes interiores, con forma
+    (ny, nx) (renglón j = y, columna i = x); las fronteras se tratan en los coeficientes (ver
+    Coefficients2D).
+
+    Métodos:
+        constructor(nodes,length,stretching,ratio): número de nodos (caras) y longitud en cada
+                  dirección, como pares (x, y) o un solo valor para ambas
+        meshX(), meshY(): get mallas 1D de cada dirección
+        nx(), ny(): get número de volúmenes en x y en y
+        dx(), dy(): get tamaño de los volúmenes en x (nx valores) y en y (ny valores)
+        x(), y(): get coordenadas 1D de los centros con las fronteras (ver Mesh.createMesh)
+        createMesh(): regresa (X, Y), las coordenadas de los centros de los volúmenes (ny, nx)
+
+    Atributos:
+        meshX, meshY: mallas 1D
+        dx, dy: tamaño de los volúmenes en cada dirección
+    """
+
+    def __init__(self, nodes = None, length = None, stretching = None, ratio = 1.0):
+        nodes, length, stretching, ratio = [v if isinstance(v, (tuple, list)) else (v, v)
+                                             for v in (nodes, length, stretching, ratio)]
+        self.__meshX = Mesh(nodes = nodes[0], length = length[0], stretching = stretching[0],
+                            ratio = ratio[0])
+        self.__meshY = Mesh(nodes = nodes[1], length = length[1], stretching = stretching[1],
+                            ratio = ratio[1])
+        self.__dx = Mesh2D.widths(self.__meshX)
+        self.__dy = Mesh2D.widths(self.__meshY)
+
+    @staticmethod
+    def widths(mesh):
+        # Tamaño de los volúmenes interiores de una malla 1D (delta puede ser escalar)
+        n = mesh.volumes() - 2
+        return np.broadcast_to(np.asarray(mesh.delta(), dtype = float)[...,1:-1]
+                               if np.ndim(mesh.delta()) else mesh.delta(), (n,)).copy()
+
+    def meshX(self):
+        return self.__meshX
+
+    def meshY(self):
+        return self.__meshY
+
+    def nx(self):
+        return self.__dx.size
+
+    def ny(self):
+        return self.__dy.size
+
+    def dx(self):
+        return self.__dx
+
+    def dy(self):
+        return self.__dy
+
+    def x(self):
+        return self.__meshX.createMesh()
+
+    def y(self):
+        return self.__meshY.createMesh()
+
+    @timed()
+    def createMesh(self):
+        return np.meshgrid(self.x()[1:-1], self.y()[1:-1])
+
+if __name__ == '__main__':
+
+    m = Mesh2D(nodes = (6, 4), length = (1.0, 0.5))
+    print(m.nx(), m.ny(), m.dx(), m.dy(), sep = '\n')
+    X, Y = m.createMesh()
+    print(X.shape, X[0], Y[:,0], sep = '\n')
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo con un solver multimalla geométrico para los sistemas 1D de Matrix. Con mallas finas los
+métodos iterativos (Gauss-Seidel, SOR, Krylov) eliminan rápido las componentes de alta
+frecuencia del error pero muy despacio las suaves, y el número de iteraciones crece con el
+número de volúmenes. El multimalla suaviza el error en la malla fina y corrige las componentes
+suaves en mallas más gruesas, donde vuelven a ser de alta frecuencia, así que el número de
+ciclos no depende de N y el costo total es O(N).
+
+Las mallas gruesas se obtienen por aglomeración: cada volumen grueso junta dos volúmenes finos
+vecinos (las caras gruesas son una sí y una no de las caras finas, también en mallas no
+uniformes) y los coeficientes se vuelven a calcular en cada nivel con Sweep.assemble, con las
+mismas propiedades y tipos de frontera del caso. Las propiedades por volumen (Gamma y Sp con nvx
+valores) se promedian con el tamaño de los volúmenes; Gamma por cara (nvx-1 valores) se combina
+como resistencias en serie entre los centros gruesos, de modo que la conductancia de cada cara
+gruesa es la de los tramos finos que cruza. Entre niveles:
+    restricción: el residuo de un volumen grueso es la suma de los residuos de sus volúmenes
+                 finos (las ecuaciones de volumen finito están integradas en cada volumen)
+    prolongación: interpolación lineal de la corrección entre los centros gruesos; junto a una
+                  frontera se interpola con el valor de la corrección en la pared (cero con
+                  DIRICHLET, el del volumen vecino con NEUMMAN)
+"""
+
+import numpy as np
+from Matrix import Matrix
+from Solvers import IterativeSolver
+from Sweep import assemble
+from Timer import timed, count
+
+class Multigrid():
+    """
+    Clase con la jerarquía de mallas y el ciclo multimalla de un caso (diccionario con el formato
+    de Sweep). Se usa como solver (solve) o como precondicionador de los métodos de Krylov
+    (preconditioner, para IterativeSolver con precond = Multigrid(...).preconditioner()).
+
+    Métodos:
+        constructor(case,cycle,smoother,pre,post,omega,minSize,tol,maxiter): caso a resolver,
+                  tipo de ciclo ('V' o 'W'), suavizador ('GaussSeidel', 'SOR' o 'TDMA', ver
+                  IterativeSolver), barridos antes y después de la corrección gruesa, factor de
+                  relajación, número de volúmenes de la malla más gruesa (se resuelve directo),
+                  tolerancia del residuo relativo y máximo de ciclos
+        solve(phi0,b): aplica ciclos hasta la tolerancia y regresa la solución (nvx-2 valores,
+                  sin fronteras). b es el lado derecho (Su del caso por omisión)
+        cycle(x,b): aplica un ciclo a x (en el lugar) y lo regresa
+        preconditioner(): regresa un LinearOperator que aplica un ciclo desde cero
+        mesh(), coef(): get malla y coeficientes de la malla fina
+        levels(): get número de volúmenes de cada nivel (del fino al grueso)
+        residuals(): get historia de la norma relativa del residuo
+        iterations(): get número de ciclos realizados
+        converged(): True si se alcanzó la tolerancia
+
+    Atributos:
+        levels: lista de niveles, cada uno un diccionario con la matriz dispersa, el esténcil y
+                los datos de la aglomeración hacia el nivel siguiente
+        gamma: número de visitas a la malla gruesa en cada nivel (1 en 'V', 2 en 'W'; en 1D el
+               ciclo W hace O(N / minSize) llamadas a la malla más gruesa, así que conviene
+               'V' salvo en problemas difíciles). Con saltos grandes de Gamma la prolongación
+               lineal hace que se necesiten más ciclos; ahí conviene usarlo como precondicionador
+        smoother: IterativeSolver que hace los barridos
+    """
+
+    def __init__(self, case = None, cycle = 'V', smoother = 'GaussSeidel', pre = 2, post = 2,
+                 omega = 1.0, minSize = 32, tol = 1e-10, maxiter = 50):
+        self.__gamma = 2 if cycle == 'W' else 1
+        self.__smoother = IterativeSolver(metodo = smoother, omega = omega)
+        self.__pre = pre
+        self.__post = post
+        self.__tol = tol
+        self.__maxiter = maxiter
+        self.__residuals = []
+        self.__converged = False
+        self.__build(case, minSize)
+
+    @timed('Multigrid.setup')
+    def __build(self, case, minSize):
+        self.__levels = []
+        self.__mesh, self.__coef = assemble(case)
+        coef = self.__coef
+        faces = self.__mesh.faces()
+        # Las correcciones de los niveles gruesos no llevan fuentes ni valores de frontera
+        types = {wall: tipo for wall, (tipo, valor) in case['bc'].items()}
+        coarse = dict(case, Su = 0.0, bc = {wall: (tipo, 0.0) for wall, tipo in types.items()})
+        coarse.pop('nodes', None)
+        coarse.pop('length', None)
+        while True:
+            N = faces.size - 1
+            A = Matrix(N + 2, storage = 'sparse')
+            A.build(coef)
+            level = {'N': N, 'A': A.mat(), 'stencil': IterativeSolver.stencil(coef)[:5]}
+            self.__levels.append(level)
+            if N <= minSize:
+                B = Matrix(N + 2, storage = 'banded')
+                B.build(coef)
+                level['direct'] = B
+                break
+            cfaces = faces[::2] if N % 2 == 0 else np.append(faces[::2], faces[-1])
+            level['starts'] = np.arange(0, N, 2)
+            level['prolong'] = Multigrid.__interpolation(faces, cfaces, types)
+            for key in ('Gamma', 'Sp'):
+                if np.ndim(case.get(key, 0.0)) == 0:
+                    continue
+                values = np.asarray(coarse[key], dtype = float)
+                if values.shape == (N + 2,):
+                    coarse[key] = Multigrid.__coarsen(values, np.diff(faces), level['starts'])
+                elif key == 'Gamma' and values.shape == (N + 1,):
+                    coarse[key] = Multigrid.__coarsenFaces(values, faces, cfaces)
+                else:
+                    raise ValueError('Multigrid: {} debe ser un escalar, un arreglo por volumen '
+                                     '(nvx valores) o, para Gamma, por cara (nvx-1 valores); '
+                                     'se recibieron {} valores'.format(key, values.size))
+            faces = cfaces
+            coef = assemble(dict(coarse, faces = faces))[1]
+
+    @staticmethod
+    def __coarsen(values, dx, starts):
+        # Propiedad por volumen (nvx valores): promedio pesado con el tamaño de los volúmenes
+        interior = np.add.reduceat(values[1:-1] * dx, starts) / np.add.reduceat(dx, starts)
+        return np.concatenate((values[:1], interior, values[-1:]))
+
+    @staticmethod
+    def __coarsenFaces(Gamma, faces, cfaces):
+        """
+        Gamma por cara (nvx-1 valores): el Gamma de la cara j vale en el tramo entre los centros
+        de sus dos volúmenes (en las paredes, entre la pared y el primer centro). La resistencia
+        entre dos puntos es la integral de 1 / Gamma, y el Gamma de cada cara gruesa es la
+        distancia entre los centros gruesos entre esa resistencia (media armónica pesada).
+        """
+        x = np.concatenate(([faces[0]], 0.5 * (faces[:-1] + faces[1:]), [faces[-1]]))
+        R = np.concatenate(([0.0], np.cumsum(np.diff(x) / Gamma)))
+        xc = np.concatenate(([cfaces[0]], 0.5 * (cfaces[:-1] + cfaces[1:]), [cfaces[-1]]))
+        return np.diff(xc) / np.diff(np.interp(xc, x, R))
+
+    @staticmethod
+    def __interpolation(faces, cfaces, types):
+        """
+        Regresa (p, q, w) para la prolongación: la corrección en el volumen fino i es
+        (1 - w) * e[p] + w * e[q], con e la corrección gruesa extendida con los valores en las
+        dos paredes (índices 0 y Nc+1).
+        """
+        x = 0.5 * (faces[:-1] + faces[1:])
+        xc = np.concatenate(([cfaces[0]], 0.5 * (cfaces[:-1] + cfaces[1:]), [cfaces[-1]]))
+        p = np.arange(x.size) // 2 + 1
+        q = np.where(x < xc[p], p - 1, p + 1)
+        w = (x - xc[p]) / (xc[q] - xc[p])
+        neumman = (types.get('LEFT_WALL') == 'NEUMMAN', types.get('RIGHT_WALL') == 'NEUMMAN')
+        return p, q, w, neumman
+
+    def mesh(self):
+        return self.__mesh
+
+    def coef(self):
+        return self.__coef
+
+    def levels(self):
+        return [level['N'] for level in self.__levels]
+
+    def residuals(self):
+        return self.__residuals
+
+    def iterations(self):
+        return len(self.__residuals) - 1
+
+    def converged(self):
+        return self.__converged
+
+    def __prolong(self, level, e):
+        p, q, w, neumman = level['prolong']
+        ext = np.zeros(e.size + 2)
+        ext[1:-1] = e
+        if neumman[0]:
+            ext[0] = e[0]
+        if neumman[1]:
+            ext[-1] = e[-1]
+        return (1 - w) * ext[p] + w * ext[q]
+
+    def __cycle(self, l, x, b):
+        level = self.__levels[l]
+        if 'direct' in level:
+            x[:] = level['direct'].solve(b)
+            return x
+        stencil = level['stencil']
+        self.__smoother.smooth(stencil, x, b, self.__pre)
+        r = b - level['A'] @ x
+        rc = np.add.reduceat(r, level['starts'])
+        e = np.zeros(rc.size)
+        for k in range(self.__gamma):
+            self.__cycle(l + 1, e, rc)
+        x += self.__prolong(level, e)
+        self.__smoother.smooth(stencil, x, b, self.__post)
+        return x
+
+    def cycle(self, x, b):
+        return self.__cycle(0, x, b)
+
+    @timed()
+    def solve(self, phi0 = None, b = None):
+        A = self.__levels[0]['A']
+        b = self.__coef.Su()[1:-1] if b is None else b
+        x = np.zeros(b.size) if phi0 is None else np.array(phi0, dtype = float)
+        bnorm = np.linalg.norm(b) or 1.0
+        self.__residuals = [np.linalg.norm(b - A @ x) / bnorm]
+        self.__converged = self.__residuals[0] <= self.__tol
+        for k in range(self.__maxiter):
+            if self.__converged:
+                break
+            self.__cycle(0, x, b)
+            self.__residuals.append(np.linalg.norm(b - A @ x) / bnorm)
+            self.__converged = self.__residuals[-1] <= self.__tol
+        count('Multigrid.cycles', self.iterations())
+        return x
+
+    def preconditioner(self):
+        from scipy.sparse.linalg import LinearOperator
+        N = self.__levels[0]['N']
+        return LinearOperator((N, N), lambda r: self.__cycle(0, np.zeros(N), np.ravel(r)))
+
+if __name__ == '__main__':
+
+    import time
+    from Sweep import fillBoundary
+
+    # Ejemplo 4.2 (aleta con Sp): los ciclos no dependen de N y el tiempo crece como N
+    def case(N, stretching = None):
+        return {'nodes': N + 1, 'length': 1.0, 'Gamma': 1.0, 'Sp': -25.0,
+                'stretching': stretching, 'ratio': 0.9999,
+                'bc': {'LEFT_WALL': ('DIRICHLET', 100.0), 'RIGHT_WALL': ('NEUMMAN', 0.0)}}
+
+    def analytic(x):
+        n = 5.0
+        return 100.0 * np.cosh(n * (1 - x)) / np.cosh(n)
+
+    print('%8s %6s %10s %10s %12s' % ('N', 'Ciclo', 'Ciclos', 'Tiempo', 'Error'))
+    for N in (1000, 10000, 100000, 1000000):
+        # En 1D el ciclo W visita 2^niveles veces la malla gruesa: sólo hasta N = 1e4
+        for cycle in ('V', 'W') if N <= 10000 else ('V',):
+            mg = Multigrid(case(N), cycle = cycle, tol = 1e-12)
+            t1 = time.perf_counter()
+            x = mg.solve()
+            t2 = time.perf_counter()
+            phi = np.zeros(N + 2)
+            phi[1:-1] = x
+            fillBoundary(phi, case(N)['bc'], mg.mesh().delta())
+            error = np.max(np.abs(phi - analytic(mg.mesh().createMesh())))
+            print('%8d %6s %10d %10.4f %12.3e' % (N, cycle, mg.iterations(), t2 - t1, error))
+    print('-' * 20)
+
+    # Malla no uniforme y advección con Upwind1
+    mg = Multigrid(dict(case(20000, 'geometric'), u = 2.5), smoother = 'SOR', omega = 1.2)
+    mg.solve()
+    print(mg.levels()[:4], mg.iterations(), mg.residuals()[-1])
+    print('-' * 20)
+
+    # Gamma no uniforme, por volumen y por cara, contra la solución directa. Con Gamma suave los
+    # ciclos son los mismos que con Gamma constante; con dos materiales (1 y 100) la prolongación
+    # lineal no sigue el quiebre de la solución en la interfaz y se necesitan más ciclos
+    from Sweep import solveCase
+    from Mesh import Mesh
+    N = 20000
+    x = Mesh(nodes = N + 1, length = 1.0, stretching = 'geometric', ratio = 0.9999).faces()
+    xv = np.concatenate(([x[0]], 0.5 * (x[:-1] + x[1:]), [x[-1]]))
+    for name, Gamma, maxiter in (('volumen, suave', 1 + 0.5 * np.sin(20 * xv), 15),
+                                 ('cara, suave', 1 + 0.5 * np.sin(20 * x), 15),
+                                 ('volumen, 2 materiales', np.where(xv < 0.3, 1.0, 100.0), 200),
+                                 ('cara, 2 materiales', np.where(x < 0.3, 1.0, 100.0), 200)):
+        c = dict(case(N, 'geometric'), Gamma = Gamma)
+        mg = Multigrid(c, tol = 1e-12, maxiter = maxiter)
+        phi = solveCase(c)['phi'][1:-1]
+        error = np.max(np.abs(mg.solve() - phi)) / np.max(np.abs(phi))
+        print('Gamma por %-22s %3d ciclos, diferencia relativa = %.1e' %
+              (name, mg.iterations(), error))
+        assert mg.converged() and error < 1e-8
+    print('-' * 20)
+
+    # Como precondicionador de BiCGSTAB frente a Jacobi
+    mg = Multigrid(case(100000))
+    for precond in ('jacobi', mg.preconditioner()):
+        solver = IterativeSolver('BiCGSTAB', tol = 1e-8, maxiter = 5000, precond = precond)
+        t1 = time.perf_counter()
+        solver.solve(mg.coef())
+        t2 = time.perf_counter()
+        print(precond if isinstance(precond, str) else 'multigrid', solver.iterations(),
+              solver.converged(), '%.4f' % (t2 - t1))
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Matrix import Matrix
+from Sweep import applyBC, fillBoundary
+from Timer import timed, count
+
+class NonlinearSolver():
+    """
+    Clase que resuelve problemas estacionarios con fuentes (o Gamma) que dependen de phi mediante
+    iteraciones externas. En cada iteración la fuente se linealiza alrededor de la solución actual,
+
+        S(phi) ~ Sc + Sp * phi,   con Sp <= 0
+
+    se vuelven a aplicar las condiciones de frontera, se sub-relaja (de forma implícita, como en
+    Patankar: aP/alpha y Su + (1-alpha)/alpha aP phi) y se resuelve el sistema lineal.
+
+    Los coeficientes que no dependen de phi (advección y, si Gamma es constante, difusión) se
+    calculan una sola vez antes de crear el objeto; el constructor guarda una copia y en cada
+    iteración sólo se restauran esos arreglos en su lugar (sin reservar memoria) y se agregan las
+    partes que sí cambian. Si se da 'gamma', los coeficientes difusivos se recalculan en cada
+    iteración con el objeto Diffusion1D 'diffusion' (que debe compartir los arreglos de 'coef' y no
+    haberse calculado antes de crear este objeto).
+
+    La linealización puede ser de Picard (el usuario regresa Sc y Sp, por ejemplo con Sp = 0 o la
+    parte lineal de la fuente) o de Newton (NonlinearSolver.newton(S, dS) construye Sc y Sp a
+    partir de la fuente y su derivada).
+
+    Métodos:
+        constructor(coef,bc,linearize,diffusion,gamma,alpha,tol,maxiter,solver):
+                  coef: objeto Coefficients con la parte que no depende de phi
+                  bc: condiciones de frontera {'LEFT_WALL': (tipo, valor), ...} (ver Sweep)
+                  linearize: función linearize(phi) -> (Sc, Sp) por unidad de volumen
+                  diffusion, gamma: objeto Diffusion1D y función gamma(phi) (opcionales)
+                  alpha: factor de sub-relajación
+                  tol: tolerancia de max|phi_nueva - phi| / max(1, max|phi|)
+                  maxiter: número máximo de iteraciones externas
+                  solver: objeto IterativeSolver para la solución interna (opcional; por omisión
+                          solución directa por bandas). La solución interna empieza con la
+                          solución de la iteración anterior, así que basta una tolerancia holgada.
+        solve(phi): itera a partir de phi (nvx valores) y regresa la solución. Al terminar, los
+                    arreglos de 'coef' vuelven a tener sólo la parte que no depende de phi
+        newton(S,dS): regresa la función linearize de Newton para la fuente S y su derivada dS
+        changes(): get historia del cambio relativo en cada iteración
+        iterations(): get número de iteraciones realizadas
+        converged(): True si se alcanzó la tolerancia
+
+    Atributos:
+        coef: coeficientes del problema
+        base: copia de los coeficientes que no dependen de phi
+        alpha, tol, maxiter: parámetros de las iteraciones
+    """
+
+    def __init__(self, coef = None, bc = None, linearize = None, diffusion = None, gamma = None,
+                 alpha = 1.0, tol = 1e-6, maxiter = 100, solver = None):
+        self.__coef = coef
+        self.__bc = bc
+        self.__linearize = linearize
+        self.__diffusion = diffusion
+        self.__gamma = gamma
+        self.__alpha = alpha
+        self.__tol = tol
+        self.__maxiter = maxiter
+        self.__solver = solver
+        self.__arrays = (coef.aP(), coef.aE(), coef.aW(), coef.aEE(), coef.aWW(), coef.Su())
+        self.__base = [a.copy() for a in self.__arrays]
+        self.__nvx = coef.aP().shape[-1]
+        self.__matrix = Matrix(self.__nvx, storage = 'banded')
+        self.__changes = []
+        self.__converged = False
+
+    @staticmethod
+    def newton(S, dS):
+        def linearize(phi):
+            Sp = np.minimum(dS(phi), 0)
+            return S(phi) - Sp * phi, Sp
+        return linearize
+
+    def changes(self):
+        return self.__changes
+
+    def iterations(self):
+        return len(self.__changes)
+
+    def converged(self):
+        return self.__converged
+
+    def __assemble(self, phi):
+        coef = self.__coef
+        for a, b in zip(self.__arrays, self.__base):
+            np.copyto(a, b)
+        if self.__gamma is not None:
+            self.__diffusion.setGamma(self.__gamma(phi))
+            self.__diffusion.calcCoef()
+        if self.__linearize is not None:
+            Sc, Sp = self.__linearize(phi)
+            coef.setSu(Sc)
+            coef.setSp(Sp)
+        applyBC(coef, self.__bc)
+        if self.__alpha != 1.0:
+            aP = coef.aP()[1:-1]
+            Su = coef.Su()[1:-1]
+            Su += (1 - self.__alpha) / self.__alpha * aP * phi[1:-1]
+            aP /= self.__alpha
+
+    @timed()
+    def solve(self, phi):
+        phi = np.array(phi, dtype = float)
+        dx = self.__coef.deltaAt(slice(None))
+        fillBoundary(phi, self.__bc, dx)
+        self.__changes = []
+        self.__converged = False
+        for k in range(self.__maxiter):
+            self.__assemble(phi)
+            if self.__solver is None:
+                self.__matrix.build(self.__coef)
+                new = self.__matrix.solve(self.__coef.Su()[1:-1])
+            else:
+                new = self.__solver.solve(self.__coef, phi[1:-1])
+            change = np.max(np.abs(new - phi[1:-1])) / max(1.0, np.max(np.abs(new)))
+            phi[1:-1] = new
+            fillBoundary(phi, self.__bc, dx)
+            self.__changes.append(change)
+            if change <= self.__tol:
+                self.__converged = True
+                break
+        count('NonlinearSolver.iterations', self.iterations())
+        # Se dejan los coeficientes como se recibieron para poder volver a resolver
+        for a, b in zip(self.__arrays, self.__base):
+            np.copyto(a, b)
+        return phi
+
+if __name__ == '__main__':
+
+    from Mesh import Mesh
+    from Coefficients import Coefficients
+    from Diffusion import Diffusion1D
+
+    # Aleta del ejemplo 4.3 de Malalasekera con pérdida por convección y por radiación:
+    # S(T) = -n2 (T - Tamb) - eps (T^4 - Tamb^4)
+    n2, Tamb, TA, eps = 25.0, 20.0, 100.0, 1e-6
+    def S(T):
+        return -n2 * (T - Tamb) - eps * (T**4 - Tamb**4)
+    def dS(T):
+        return -n2 - 4 * eps * T**3
+
+    malla = Mesh(nodes = 11, length = 1.0)
+    nvx = malla.volumes()
+    delta = malla.delta()
+    coef = Coefficients(nvx, delta)
+    coef.alloc(nvx)
+    dif = Diffusion1D(nvx, Gamma = 1, dx = delta, coef = coef)
+    dif.calcCoef()
+    bc = {'LEFT_WALL': ('DIRICHLET', TA), 'RIGHT_WALL': ('NEUMMAN', 0)}
+
+    T0 = np.full(nvx, Tamb)
+    print('-' * 20)
+    picard = NonlinearSolver(coef, bc, linearize = lambda T: (S(T), 0 * T), alpha = 0.8,
+                             tol = 1e-8, maxiter = 500)
+    print('Picard', picard.solve(T0), picard.iterations(), sep = '\n')
+    print('-' * 20)
+    newton = NonlinearSolver(coef, bc, linearize = NonlinearSolver.newton(S, dS), tol = 1e-8)
+    print('Newton', newton.solve(T0), newton.iterations(), newton.changes(), sep = '\n')
+    print('-' * 20)
+
+    # Conductividad que depende de la temperatura, Gamma = 1 + 0.01 T
+    coef2 = Coefficients(nvx, delta)
+    coef2.alloc(nvx)
+    dif2 = Diffusion1D(nvx, Gamma = 1, dx = delta, coef = coef2)
+    gamma = NonlinearSolver(coef2, bc, linearize = NonlinearSolver.newton(S, dS),
+                            diffusion = dif2, gamma = lambda T: 1 + 0.01 * T, tol = 1e-8)
+    print('Gamma(T)', gamma.solve(T0), gamma.iterations(), sep = '\n')
+    print('-' * 20)
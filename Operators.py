@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo con operadores ensamblados y factorizados que se reutilizan entre casos. La matriz de un
+caso sólo depende de la malla, de las propiedades (Gamma, rho, u, esquema), de Sp y de los tipos
+de las condiciones de frontera; los valores de frontera y la magnitud de la fuente Su sólo entran
+en el lado derecho, que es lineal en ellos:
+
+    b = Su * dx + sum_w valor_w * e_w
+
+donde e_w es la contribución de la frontera w con valor 1. Un Operator guarda las diagonales,
+la factorización LU (scipy.sparse.linalg.splu) y los vectores dx y e_w, así que resolver otro
+caso con el mismo operador es sólo armar b y hacer la sustitución. Con solveMany se resuelven
+de una vez k lados derechos (por ejemplo miles de casos de carga en un estudio de sensibilidad)
+como un bloque B de forma (N, k) con la misma factorización. OperatorCache guarda los
+operadores en un caché LRU limitado en número y en memoria.
+"""
+
+from collections import OrderedDict
+import numpy as np
+from Matrix import Matrix
+from Coefficients import Coefficients
+from Sweep import assemble, advective, applyBC, fillBoundary
+from Timer import timed, count
+
+def hashable(value):
+    # Los arreglos (Gamma, Sp o u por volumen o por cara) se comparan por su contenido
+    if isinstance(value, np.ndarray):
+        return (value.shape, value.tobytes())
+    return value
+
+def operatorKey(case):
+    """
+    Llave de un caso (ver Sweep) con los parámetros que definen la matriz: malla (nodes y length
+    o las coordenadas de las caras, faces), propiedades, esquema (sólo si hay advección), Sp,
+    tipos de frontera y tipo de punto flotante. No incluye los valores de frontera ni Su.
+    """
+    u = case.get('u', 0.0)
+    metodo = case.get('metodo', 'Upwind1') if advective(case) else None
+    bc = tuple(sorted((wall, tipo) for wall, (tipo, valor) in case['bc'].items()))
+    faces = case.get('faces')
+    if faces is not None:
+        faces = tuple(np.asarray(faces, dtype = float).tolist())
+    return (case.get('nodes'), case.get('length'), faces, case.get('stretching'),
+            case.get('ratio', 1.0),
+            hashable(case['Gamma']), case.get('rho', 1.0), hashable(u), metodo,
+            hashable(case.get('Sp', 0.0)), bc, np.dtype(case.get('dtype', float)).name)
+
+class Operator():
+    """
+    Clase con el operador ensamblado y factorizado de un caso, independiente de los valores de
+    frontera y de Su.
+
+    Métodos:
+        constructor(case): ensambla los coeficientes (con los tipos de frontera del caso) y
+                           factoriza la matriz
+        rhs(bc,Su): lado derecho (N valores) para los valores de frontera {'LEFT_WALL': valor, ...}
+                    (los que falten valen 0) y la fuente Su (escalar o por volumen)
+        solve(bc,Su): regresa la solución (nvx valores, incluyendo fronteras)
+        rhsMany(bc,Su): bloque de k lados derechos (N, k); los valores de frontera son arreglos de
+                        k elementos y Su es un arreglo de k magnitudes o de forma (nvx, k) con una
+                        fuente por volumen en cada columna
+        solveMany(bc,Su): regresa las k soluciones (nvx, k) con una sola sustitución en bloque
+        solveRhs(b): resuelve con un lado derecho ya armado (N valores o bloque (N, k))
+        units(): get diccionario {frontera: e_w}
+        diagonals(): get diagonales de la matriz (ver Matrix.diagonals)
+        x(): get coordenadas de la malla
+        delta(): get tamaño de los volúmenes
+        nbytes(): memoria aproximada (diagonales, vectores y factores LU)
+
+    Atributos:
+        types: tipos de frontera {'LEFT_WALL': tipo, ...}
+        diagonals: diagonales de la matriz
+        lu: factorización LU dispersa
+        dx: tamaño de los volúmenes interiores (contribución de Su)
+        units: contribución de cada frontera con valor 1
+        x, delta: malla
+    """
+
+    @timed()
+    def __init__(self, case = None):
+        from scipy.sparse import diags
+        from scipy.sparse.linalg import splu
+        self.__types = {wall: tipo for wall, (tipo, valor) in case['bc'].items()}
+        # Coeficientes sin fronteras ni Su
+        malla, coef = assemble(dict(case, bc = {}, Su = 0.0))
+        nvx = malla.volumes()
+        delta = malla.delta()
+        N = nvx - 2
+        self.__units = {}
+        for wall, tipo in self.__types.items():
+            unit = Coefficients(nvx, delta)
+            unit.setArrays(**{key: a.copy() for key, a in coef.arrays().items()})
+            applyBC(unit, {wall: (tipo, 1.0)})
+            self.__units[wall] = unit.Su()[1:-1].copy()
+        applyBC(coef, {wall: (tipo, 0.0) for wall, tipo in self.__types.items()})
+        self.__diagonals = tuple(d.copy() for d in Matrix.diagonals(coef))
+        A = diags(self.__diagonals, [-2, -1, 0, 1, 2], shape = (N, N), format = 'csc')
+        self.__lu = splu(A)
+        self.__dx = np.broadcast_to(coef.deltaAt(slice(1, -1)), (N,)).copy()
+        self.__delta = delta
+        self.__x = malla.createMesh()
+
+    def units(self):
+        return self.__units
+
+    def diagonals(self):
+        return self.__diagonals
+
+    def x(self):
+        return self.__x
+
+    def delta(self):
+        return self.__delta
+
+    def nbytes(self):
+        arrays = self.__diagonals + (self.__dx, self.__x) + tuple(self.__units.values())
+        # Factores L y U: valor (8 bytes) e índice (4 bytes) por entrada, más los apuntadores a
+        # las columnas de cada factor (N + 1 enteros de 4 bytes)
+        N = self.__dx.size
+        return sum(a.nbytes for a in arrays) + 12 * self.__lu.nnz + 2 * 4 * (N + 1)
+
+    def rhs(self, bc = None, Su = 0.0):
+        if np.shape(Su)[-1:] == (self.__x.size,):
+            # Fuente por volumen (nvx valores): sólo cuentan los interiores
+            Su = Su[...,1:-1]
+        b = Su * self.__dx
+        b = b.copy() if np.ndim(b) else np.full(self.__dx.size, b)
+        for wall, valor in (bc or {}).items():
+            b += valor * self.__units[wall]
+        return b
+
+    def rhsMany(self, bc = None, Su = 0.0):
+        bc = {wall: np.atleast_1d(valor) for wall, valor in (bc or {}).items()}
+        Su = np.asarray(Su, dtype = float)
+        if Su.ndim == 2 and Su.shape[0] == self.__x.size:
+            Su = Su[1:-1]
+        k = max([np.shape(Su)[-1] if Su.ndim else 1] + [v.size for v in bc.values()])
+        dx = self.__dx[:,None]
+        B = np.empty((dx.size, k))
+        # Su de k magnitudes (se propaga por renglones) o de forma (N, k)
+        np.multiply(dx, Su if Su.ndim == 2 else Su[None] if Su.ndim else Su, out = B)
+        for wall, valor in bc.items():
+            B += self.__units[wall][:,None] * valor[None,:]
+        return B
+
+    def solveRhs(self, b):
+        return self.__lu.solve(b)
+
+    @timed()
+    def solveMany(self, bc = None, Su = 0.0):
+        bc = bc or {}
+        B = self.rhsMany(bc, Su)
+        phi = np.zeros((self.__x.size, B.shape[1]))
+        phi[1:-1] = self.__lu.solve(B)
+        fillBoundary(phi, {wall: (tipo, np.atleast_1d(bc.get(wall, 0.0)))
+                           for wall, tipo in self.__types.items()}, self.__delta)
+        return phi
+
+    @timed()
+    def solve(self, bc = None, Su = 0.0):
+        bc = bc or {}
+        phi = np.zeros(self.__x.size)
+        phi[1:-1] = self.__lu.solve(self.rhs(bc, Su))
+        fillBoundary(phi, {wall: (tipo, bc.get(wall, 0.0)) for wall, tipo in self.__types.items()},
+                     self.__delta)
+        return phi
+
+class OperatorCache():
+    """
+    Clase con un caché LRU de objetos Operator. Cuando se pide el operador de un caso se busca por
+    su llave (operatorKey); si no está, se construye y se guarda, y se desalojan los operadores
+    usados hace más tiempo mientras haya más de 'maxsize' operadores o se usen más de 'maxbytes'
+    bytes.
+
+    Métodos:
+        constructor(maxsize,maxbytes): límites del caché
+        get(case): regresa el operador del caso (del caché o nuevo)
+        solve(case): resuelve el caso con su operador (valores de frontera y Su del caso)
+        nbytes(): get memoria usada por los operadores guardados
+        stats(): get diccionario con aciertos, fallos, desalojos, operadores y memoria
+        clear(): vacía el caché
+
+    Atributos:
+        operators: diccionario ordenado {llave: Operator}, el último es el más reciente
+        maxsize, maxbytes: límites
+        hits, misses, evictions: estadísticas de uso
+    """
+
+    def __init__(self, maxsize = 32, maxbytes = None):
+        self.__operators = OrderedDict()
+        self.__maxsize = maxsize
+        self.__maxbytes = maxbytes
+        self.__nbytes = 0
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    def __len__(self):
+        return len(self.__operators)
+
+    def nbytes(self):
+        return self.__nbytes
+
+    def stats(self):
+        return {'hits': self.__hits, 'misses': self.__misses, 'evictions': self.__evictions,
+                'operators': len(self.__operators), 'nbytes': self.__nbytes}
+
+    def clear(self):
+        self.__operators.clear()
+        self.__nbytes = 0
+
+    def get(self, case):
+        key = operatorKey(case)
+        op = self.__operators.get(key)
+        if op is not None:
+            self.__hits += 1
+            count('OperatorCache.hits')
+            self.__operators.move_to_end(key)
+            return op
+        self.__misses += 1
+        count('OperatorCache.misses')
+        op = Operator(case)
+        self.__operators[key] = op
+        self.__nbytes += op.nbytes()
+        # Se desaloja desde el menos reciente, pero nunca el operador que se acaba de construir
+        while len(self.__operators) > 1 and (len(self.__operators) > self.__maxsize or
+              (self.__maxbytes is not None and self.__nbytes > self.__maxbytes)):
+            old_key, old = self.__operators.popitem(last = False)
+            self.__nbytes -= old.nbytes()
+            self.__evictions += 1
+        return op
+
+    def solve(self, case):
+        bc = {wall: valor for wall, (tipo, valor) in case['bc'].items()}
+        return self.get(case).solve(bc, case.get('Su', 0.0))
+
+if __name__ == '__main__':
+
+    from Sweep import grid, solveCase
+
+    # Mismo operador para varios valores de frontera y de fuente
+    cases = grid(nodes = 11, length = 1.0, Gamma = 1.0, Sp = -25.0, Su = [0.0, 500.0],
+                 bc = [{'LEFT_WALL': ('DIRICHLET', T), 'RIGHT_WALL': ('NEUMMAN', 0)}
+                       for T in (100, 150, 200)])
+    cache = OperatorCache(maxsize = 4)
+    for case in cases:
+        phi = cache.solve(case)
+        print(np.max(np.abs(phi - solveCase(case)['phi'])))
+    print(cache.stats())
+    print('-' * 20)
+
+    # Sensibilidad a la fuente y a la temperatura de la base: 1000 casos de carga en un bloque
+    op = cache.get(cases[0])
+    k = 1000
+    TA = np.linspace(100, 200, k)
+    q = np.linspace(0, 500, k)
+    phi = op.solveMany({'LEFT_WALL': TA, 'RIGHT_WALL': np.zeros(k)}, q)
+    print(phi.shape, phi[-1, [0, -1]])
+    print('-' * 20)
+
+    # Casos dados sólo por las caras: mallas distintas con el mismo número de nodos tienen
+    # operadores distintos
+    cache = OperatorCache()
+    for f in (np.linspace(0, 1, 11), np.linspace(0, 1, 11)**2):
+        case = {'faces': f, 'Gamma': 1.0, 'Su': 100.0,
+                'bc': {'LEFT_WALL': ('DIRICHLET', 1.0), 'RIGHT_WALL': ('DIRICHLET', 0.0)}}
+        error = np.max(np.abs(cache.solve(case) - solveCase(case)['phi']))
+        assert error < 1e-10, error
+        print(error)
+    print(cache.stats())
+
+    # Velocidad por cara: la llave compara el contenido del arreglo
+    cache = OperatorCache()
+    case = {'nodes': 11, 'length': 1.0, 'Gamma': 0.1, 'metodo': 'Quick',
+            'bc': {'LEFT_WALL': ('DIRICHLET', 1.0), 'RIGHT_WALL': ('DIRICHLET', 0.0)}}
+    for u in (np.full(11, 2.5), np.linspace(0.5, 2.5, 11), np.linspace(0.5, 2.5, 11)):
+        c = dict(case, u = u)
+        error = np.max(np.abs(cache.solve(c) - solveCase(c)['phi']))
+        assert error < 1e-10, error
+        print(error)
+    stats = cache.stats()
+    print(stats)
+    assert stats['hits'] == 1 and stats['misses'] == 2
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import shutil
+import time
+import numpy as np
+from Timer import timed
+
+class SnapshotWriter():
+    """
+    Clase que guarda la historia de una solución no estacionaria directamente en disco. Al crearla
+    se reservan archivos .npy con memoria mapeada (np.lib.format.open_memmap) para 'snapshots'
+    soluciones de nvx valores y sus tiempos, y se guarda la malla; cada solución se copia en su
+    renglón del archivo, así que la memoria usada no crece con la longitud de la simulación y no
+    se reservan arreglos en cada paso.
+
+    En el directorio 'path' quedan:
+        x.npy: coordenadas de la malla (Mesh.createMesh)
+        t.npy: tiempos de las soluciones guardadas (NaN en los renglones sin usar)
+        phi.npy: arreglo (snapshots, nvx) con las soluciones
+
+    La frecuencia de guardado se da con 'every' (cada cuántos pasos) y/o 'interval' (cada cuánto
+    tiempo); record() decide si la solución se guarda. TimeIntegrator.step y TimeController
+    llaman a record() después de cada paso (aceptado) si reciben un objeto SnapshotWriter.
+
+    Métodos:
+        constructor(path,x,snapshots,every,interval,dtype): crea los archivos
+        record(t,phi,step): guarda phi si toca según la frecuencia y hay lugar. Regresa True si
+                            se guardó
+        write(t,phi): guarda phi sin revisar la frecuencia
+        written(): get número de soluciones guardadas
+        full(): True si ya no hay lugar para más soluciones
+        flush(): escribe a disco los cambios pendientes
+        close(): escribe a disco y libera los mapas de memoria
+
+    Atributos:
+        path: directorio de salida
+        phi, t: arreglos con memoria mapeada
+        every, interval: frecuencia de guardado
+        count: número de soluciones guardadas
+        next: siguiente tiempo de guardado (con 'interval')
+    """
+
+    def __init__(self, path = None, x = None, snapshots = None, every = 1, interval = None,
+                 dtype = np.float64):
+        os.makedirs(path, exist_ok = True)
+        self.__path = path
+        np.save(os.path.join(path, 'x.npy'), x)
+        self.__phi = np.lib.format.open_memmap(os.path.join(path, 'phi.npy'), mode = 'w+',
+                                               dtype = dtype, shape = (snapshots, np.size(x)))
+        self.__t = np.lib.format.open_memmap(os.path.join(path, 't.npy'), mode = 'w+',
+                                             dtype = np.float64, shape = (snapshots,))
+        self.__t.fill(np.nan)
+        self.__every = every
+        self.__interval = interval
+        self.__count = 0
+        self.__next = None
+
+    def written(self):
+        return self.__count
+
+    def full(self):
+        return self.__count >= self.__t.size
+
+    def write(self, t, phi):
+        if self.full():
+            return False
+        np.copyto(self.__phi[self.__count], phi, casting = 'same_kind')
+        self.__t[self.__count] = t
+        self.__count += 1
+        return True
+
+    @timed()
+    def record(self, t, phi, step = 0):
+        if self.__every and step % self.__every:
+            return False
+        if self.__interval:
+            # Tolerancia relativa para no perder una salida por redondeo en la suma de los pasos
+            if self.__next is not None and t < self.__next - 1e-9 * self.__interval:
+                return False
+            # Los tiempos de salida son múltiplos de 'interval' aunque los pasos no caigan en ellos
+            self.__next = (np.floor(t / self.__interval + 1e-9) + 1) * self.__interval
+        return self.write(t, phi)
+
+    def flush(self):
+        self.__phi.flush()
+        self.__t.flush()
+
+    def close(self):
+        self.flush()
+        del self.__phi
+        del self.__t
+
+def loadSnapshots(path, mmap_mode = 'r'):
+    """
+    Regresa (x, t, phi) de una salida de SnapshotWriter, sólo con los renglones guardados. phi se
+    abre con memoria mapeada, así que no se lee completo a memoria.
+    """
+    x = np.load(os.path.join(path, 'x.npy'))
+    t = np.load(os.path.join(path, 't.npy'), mmap_mode = mmap_mode)
+    phi = np.load(os.path.join(path, 'phi.npy'), mmap_mode = mmap_mode)
+    n = np.count_nonzero(~np.isnan(t))
+    return x, t[:n], phi[:n]
+
+class Checkpoint():
+    """
+    Clase que guarda periódicamente el estado de una simulación no estacionaria para poder
+    continuarla (restart()) si se interrumpe. Cada punto de control es un directorio
+    'path/step-NNNNNNNN' con:
+        phi.npy: solución actual (incluyendo fronteras)
+        aP.npy, aE.npy, aW.npy, aEE.npy, aWW.npy, Su.npy: coeficientes ya ensamblados (con
+                  fuentes y condiciones de frontera), para no repetir el ensamble
+        delta.npy: tamaño de los volúmenes
+        meta.json: tiempo, número de pasos, paso de tiempo, esquema temporal y densidad
+    El directorio se escribe primero con otro nombre y después se renombra (os.replace), y el
+    archivo 'path/latest' con el nombre del último punto de control se reemplaza de la misma
+    forma, así que una interrupción a la mitad de la escritura nunca deja un punto de control
+    incompleto como el último. Sólo se conservan los últimos 'keep'.
+
+    Métodos:
+        constructor(path,integrator,coef,every,seconds,keep): recibe el directorio, el objeto
+                  TimeIntegrator, los coeficientes y la frecuencia (cada 'every' pasos y/o cada
+                  'seconds' segundos de cómputo)
+        record(t,phi,step): guarda si toca según la frecuencia (se puede pasar como 'writer' a
+                            TimeIntegrator.step y TimeController). 'step' es el número de pasos
+                            que pasa quien llama (integrator.steps() si no se da). Regresa True
+                            si se guardó
+        save(step): guarda un punto de control con el número de pasos 'step' (por omisión
+                    integrator.steps()) y regresa su directorio
+        saved(): get número de puntos de control guardados
+
+    Atributos:
+        path: directorio de los puntos de control
+        integrator, coef: simulación que se guarda
+        every, seconds: frecuencia de guardado
+        keep: número de puntos de control que se conservan
+    """
+
+    ARRAYS = ('aP', 'aE', 'aW', 'aEE', 'aWW', 'Su')
+
+    def __init__(self, path = None, integrator = None, coef = None, every = None, seconds = None,
+                 keep = 2):
+        os.makedirs(path, exist_ok = True)
+        self.__path = path
+        self.__integrator = integrator
+        self.__coef = coef
+        self.__every = every
+        self.__seconds = seconds
+        self.__keep = keep
+        self.__last = time.time()
+        self.__saved = 0
+
+    def saved(self):
+        return self.__saved
+
+    def record(self, t, phi, step = None):
+        if step is None:
+            step = self.__integrator.steps()
+        due = bool(self.__every) and step % self.__every == 0
+        due = due or (self.__seconds is not None and time.time() - self.__last >= self.__seconds)
+        if not due:
+            return False
+        self.save(step)
+        return True
+
+    @timed()
+    def save(self, step = None):
+        integ = self.__integrator
+        if step is None:
+            step = integ.steps()
+        name = 'step-{:08d}'.format(step)
+        final = os.path.join(self.__path, name)
+        tmp = os.path.join(self.__path, '.tmp-' + name)
+        shutil.rmtree(tmp, ignore_errors = True)
+        os.makedirs(tmp)
+        arrays = dict(self.__coef.arrays(), phi = integ.phi(), delta = self.__coef.delta())
+        for key, value in arrays.items():
+            saveFile(os.path.join(tmp, key + '.npy'), lambda f: np.save(f, value))
+        meta = {'t': integ.time(), 'steps': step, 'dt': integ.dt(),
+                'metodo': integ.metodo(), 'rho': integ.rho()}
+        saveFile(os.path.join(tmp, 'meta.json'), lambda f: f.write(json.dumps(meta).encode()))
+        shutil.rmtree(final, ignore_errors = True)
+        os.replace(tmp, final)
+        latest = os.path.join(self.__path, 'latest')
+        saveFile(latest + '.tmp', lambda f: f.write(name.encode()))
+        os.replace(latest + '.tmp', latest)
+        # Se borran los puntos de control más viejos
+        old = sorted(d for d in os.listdir(self.__path) if d.startswith('step-'))
+        for d in old[:-self.__keep]:
+            shutil.rmtree(os.path.join(self.__path, d), ignore_errors = True)
+        self.__last = time.time()
+        self.__saved += 1
+        return final
+
+def saveFile(path, write):
+    # Escribe y fuerza la escritura a disco antes de renombrar
+    with open(path, 'wb') as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+
+def latestCheckpoint(path):
+    """
+    Regresa el directorio del último punto de control en 'path' (None si no hay).
+    """
+    latest = os.path.join(path, 'latest')
+    if not os.path.exists(latest):
+        return None
+    with open(latest) as f:
+        return os.path.join(path, f.read().strip())
+
+def restart(path, mmap_mode = 'c'):
+    """
+    Continúa una simulación a partir del último punto de control en 'path'. Los coeficientes se
+    abren con memoria mapeada (por omisión 'c', copia al escribir: se pueden modificar en memoria
+    sin cambiar los archivos) en lugar de volver a ensamblarlos. Regresa (integrator, coef) con
+    el tiempo y el número de pasos del punto de control, o None si no hay punto de control.
+    """
+    from Coefficients import Coefficients
+    from Transient import TimeIntegrator
+    d = latestCheckpoint(path)
+    if d is None:
+        return None
+    with open(os.path.join(d, 'meta.json')) as f:
+        meta = json.load(f)
+    arrays = {key: np.load(os.path.join(d, key + '.npy'), mmap_mode = mmap_mode)
+              for key in Checkpoint.ARRAYS}
+    delta = np.load(os.path.join(d, 'delta.npy'))
+    delta = delta if delta.ndim else float(delta)
+    phi = np.load(os.path.join(d, 'phi.npy'))
+    coef = Coefficients(phi.size, delta)
+    coef.setArrays(**arrays)
+    integ = TimeIntegrator(coef, rho = meta['rho'], dx = delta, dt = meta['dt'], phi = phi,
+                           metodo = meta['metodo'])
+    integ.setTime(meta['t'])
+    integ.setSteps(meta['steps'])
+    return integ, coef
+
+if __name__ == '__main__':
+
+    import tempfile
+    from Mesh import Mesh
+    from Coefficients import Coefficients
+    from Diffusion import Diffusion1D
+    from Transient import TimeIntegrator
+
+    malla = Mesh(nodes = 11, length = 1.0)
+    nvx = malla.volumes()
+    delta = malla.delta()
+    coef = Coefficients(nvx, delta)
+    coef.alloc(nvx)
+    dif = Diffusion1D(nvx, Gamma = 0.01, dx = delta, coef = coef)
+    dif.calcCoef()
+    coef.bcDirichlet('LEFT_WALL', 1)
+    coef.bcDirichlet('RIGHT_WALL', 0)
+    phi = np.zeros(nvx)
+    phi[0] = 1
+
+    path = os.path.join(tempfile.gettempdir(), 'fvm-snapshots')
+    ti = TimeIntegrator(coef, rho = 1.0, dx = delta, dt = 0.1, phi = phi)
+    writer = SnapshotWriter(path, malla.createMesh(), snapshots = 11, every = 100)
+    writer.record(ti.time(), ti.phi(), ti.steps())
+    ti.step(1000, writer = writer)
+    writer.close()
+
+    x, t, phi = loadSnapshots(path)
+    print(t, phi[-1], sep = '\n')
+    print('-' * 20)
+
+    # Simulación interrumpida a los 500 pasos y continuada desde el último punto de control
+    path = os.path.join(tempfile.gettempdir(), 'fvm-checkpoints')
+    shutil.rmtree(path, ignore_errors = True)
+    ti = TimeIntegrator(coef, rho = 1.0, dx = delta, dt = 0.1, phi = phi[0])
+    ti.step(500, writer = Checkpoint(path, ti, coef, every = 200))
+    ti, c = restart(path)
+    print(latestCheckpoint(path), ti.time(), ti.steps())
+    print(ti.step(1000 - ti.steps()), ti.time(), sep = '\n')
+    print('-' * 20)
+
+    # Con paso adaptativo el punto de control lleva el número de pasos aceptados
+    from Transient import TimeController
+    shutil.rmtree(path, ignore_errors = True)
+    ti = TimeIntegrator(coef, rho = 1.0, dx = delta, dt = 0.1, phi = phi[0])
+    control = TimeController(ti, tol = 1e-4, writer = Checkpoint(path, ti, coef, every = 10))
+    control.advance(20.0)
+    ti, c = restart(path)
+    assert ti.steps() % 10 == 0 and ti.steps() <= control.accepted()
+    print(latestCheckpoint(path), ti.steps(), control.accepted(), control.rejected())
@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import numpy as np
+from Matrix import Matrix
+from Kernels import kernel
+from Timer import timed, count
+
+class IterativeSolver():
+    """
+    Clase que resuelve de forma iterativa el sistema A phi = Su construido a partir de los
+    coeficientes de un objeto Coefficients (la misma matriz que construye Matrix). Es una
+    alternativa a la solución directa cuando basta una solución aproximada (por ejemplo dentro de
+    iteraciones no lineales), y permite empezar desde una solución previa.
+
+    Métodos disponibles ('metodo'):
+        'GaussSeidel': Gauss-Seidel (omega = 1)
+        'SOR': sobre-relajación sucesiva con factor omega. Los volúmenes se recorren en tres
+               colores (i mod 3) para que cada color se actualice con operaciones sobre arreglos
+               completos (un volumen sólo se acopla con i±1 e i±2, que son de otro color).
+        'TDMA': barridos de línea; en cada iteración se resuelve el sistema tridiagonal (aP, aE,
+                aW) con los términos de aEE y aWW evaluados con la última solución. La parte
+                negativa de aEE y aWW (esquemas como QUICK) se pasa también a la diagonal para que
+                las iteraciones converjan.
+        'BiCGSTAB', 'GMRES', 'CG': métodos de Krylov de scipy.sparse.linalg con precondicionador
+                'ilu' (factorización LU incompleta), 'jacobi' (diagonal), None o un objeto que
+                aplique el precondicionador (LinearOperator, por ejemplo
+                Multigrid.preconditioner()). 'CG' sólo es válido para matrices simétricas
+                (difusión pura).
+
+    Métodos:
+        constructor(metodo,tol,maxiter,omega,precond): set parámetros del solver
+        solve(coef,phi0): resuelve el sistema a partir de los coeficientes; phi0 es una solución
+                          inicial opcional (de tamaño nvx-2, sin fronteras). Regresa la solución.
+        solveSystem(A,b,phi0): resuelve con una matriz dispersa ya construida (por ejemplo la de
+                          Matrix2D); sólo con los métodos de Krylov
+        smooth(stencil,x,b,n): aplica n barridos de 'GaussSeidel', 'SOR' o 'TDMA' a x (en el
+                          lugar) con el esténcil de stencil() y el lado derecho b, sin calcular
+                          residuos (para usarse como suavizador, ver Multigrid)
+        residuals(): get historia de la norma relativa del residuo ||Su - A phi|| / ||Su||
+        iterations(): get número de iteraciones realizadas
+        converged(): True si se alcanzó la tolerancia
+
+    Atributos:
+        metodo: nombre del método iterativo
+        tol: tolerancia relativa del residuo
+        maxiter: número máximo de iteraciones
+        omega: factor de relajación (SOR)
+        precond: precondicionador de los métodos de Krylov
+    """
+
+    def __init__(self, metodo = 'SOR', tol = 1e-6, maxiter = 1000, omega = 1.0, precond = 'ilu'):
+        self.__metodo = metodo
+        self.__tol = tol
+        self.__maxiter = maxiter
+        self.__omega = 1.0 if metodo == 'GaussSeidel' else omega
+        self.__precond = precond
+        self.__residuals = []
+        self.__converged = False
+
+    def residuals(self):
+        return self.__residuals
+
+    def iterations(self):
+        return len(self.__residuals) - 1
+
+    def converged(self):
+        return self.__converged
+
+    @staticmethod
+    def stencil(coef):
+        """
+        Regresa (aP, aE, aW, aEE, aWW, b) de los volúmenes interiores con los acoplamientos a las
+        fronteras en cero (su efecto ya está en aP y Su), igual que en Matrix.
+        """
+        aP = coef.aP()[1:-1]
+        aE = coef.aE()[1:-1].copy()
+        aW = coef.aW()[1:-1].copy()
+        aEE = coef.aEE()[1:-1].copy()
+        aWW = coef.aWW()[1:-1].copy()
+        aE[-1:] = 0
+        aW[:1] = 0
+        aEE[-2:] = 0
+        aWW[:2] = 0
+        return aP, aE, aW, aEE, aWW, coef.Su()[1:-1]
+
+    @timed()
+    def solve(self, coef, phi0 = None):
+        A = Matrix(coef.aP().shape[-1], storage = 'sparse')
+        A.build(coef)
+        A = A.mat()
+        b = coef.Su()[1:-1]
+        N = b.size
+        x = np.zeros(N) if phi0 is None else np.array(phi0, dtype = float)
+        bnorm = np.linalg.norm(b) or 1.0
+        self.__residuals = [np.linalg.norm(b - A @ x) / bnorm]
+        self.__converged = self.__residuals[0] <= self.__tol
+        if self.__converged:
+            return x
+
+        if self.__metodo in ('GaussSeidel', 'SOR', 'TDMA'):
+            aP, aE, aW, aEE, aWW, b = IterativeSolver.stencil(coef)
+            if self.__metodo == 'TDMA':
+                sweep = self.__tdmaSweep
+            else:
+                sweep = self.__sorSweep
+            # Solución con dos ceros a cada lado para no tratar aparte los extremos
+            xp = np.zeros(N + 4)
+            xp[2:-2] = x
+            for k in range(self.__maxiter):
+                sweep(xp, aP, aE, aW, aEE, aWW, b)
+                r = np.linalg.norm(b - A @ xp[2:-2]) / bnorm
+                self.__residuals.append(r)
+                if r <= self.__tol:
+                    self.__converged = True
+                    break
+            count('IterativeSolver.iterations', self.iterations())
+            return xp[2:-2].copy()
+
+        return self.__krylov(A, b, x, bnorm)
+
+    def solveSystem(self, A, b, phi0 = None):
+        A = A.tocsr()
+        x = np.zeros(b.size) if phi0 is None else np.array(phi0, dtype = float)
+        bnorm = np.linalg.norm(b) or 1.0
+        self.__residuals = [np.linalg.norm(b - A @ x) / bnorm]
+        self.__converged = self.__residuals[0] <= self.__tol
+        if self.__converged:
+            return x
+        return self.__krylov(A, b, x, bnorm)
+
+    def smooth(self, stencil, x, b, n = 1):
+        aP, aE, aW, aEE, aWW = stencil[:5]
+        sweep = self.__tdmaSweep if self.__metodo == 'TDMA' else self.__sorSweep
+        xp = np.zeros(x.size + 4)
+        xp[2:-2] = x
+        for k in range(n):
+            sweep(xp, aP, aE, aW, aEE, aWW, b)
+        x[:] = xp[2:-2]
+        return x
+
+    def __sorSweep(self, xp, aP, aE, aW, aEE, aWW, b):
+        N = b.size
+        omega = self.__omega
+        for c in range(3):
+            i = slice(c, N, 3)
+            n = len(range(c, N, 3))
+            # Posiciones en xp (desplazadas 2 por los ceros de relleno)
+            sigma = (b[i] + aE[i] * xp[c+3:c+3+3*n:3] + aW[i] * xp[c+1:c+1+3*n:3]
+                          + aEE[i] * xp[c+4:c+4+3*n:3] + aWW[i] * xp[c:c+3*n:3])
+            xc = xp[c+2:c+2+3*n:3]
+            xc *= 1 - omega
+            xc += omega * sigma / aP[i]
+
+    def __tdmaSweep(self, xp, aP, aE, aW, aEE, aWW, b):
+        N = b.size
+        # Coeficientes negativos: neg * phi_P se suma a ambos lados (diagonal y término explícito)
+        neg = np.maximum(-aEE, 0) + np.maximum(-aWW, 0)
+        rhs = b + aEE * xp[4:] + aWW * xp[:-4] + neg * xp[2:-2]
+        loop = kernel('thomas')
+        if loop is not None:
+            loop(-aW, aP + neg, -aE, rhs, xp[2:-2])
+            return
+        from scipy.linalg import solve_banded
+        ab = np.zeros((3, N))
+        ab[0][1:] = -aE[:-1]
+        ab[1] = aP + neg
+        ab[2][:-1] = -aW[1:]
+        xp[2:-2] = solve_banded((1, 1), ab, rhs)
+
+    def __krylov(self, A, b, x, bnorm):
+        from scipy.sparse.linalg import LinearOperator, spilu, bicgstab, gmres, cg
+        N = b.size
+        M = None
+        if self.__precond == 'ilu':
+            ilu = spilu(A.tocsc())
+            M = LinearOperator((N, N), ilu.solve)
+        elif self.__precond == 'jacobi':
+            d = A.diagonal()
+            M = LinearOperator((N, N), lambda v: v / d)
+        elif self.__precond is not None:
+            M = self.__precond
+
+        def callback(xk):
+            self.__residuals.append(np.linalg.norm(b - A @ xk) / bnorm)
+
+        kwargs = dict(x0 = x, rtol = self.__tol, atol = 0.0, maxiter = self.__maxiter, M = M)
+        if self.__metodo == 'GMRES':
+            x, info = gmres(A, b, callback = callback, callback_type = 'x', **kwargs)
+        elif self.__metodo == 'CG':
+            x, info = cg(A, b, callback = callback, **kwargs)
+        else:
+            x, info = bicgstab(A, b, callback = callback, **kwargs)
+        # scipy no siempre llama al callback en la última iteración
+        r = np.linalg.norm(b - A @ x) / bnorm
+        if r != self.__residuals[-1]:
+            self.__residuals.append(r)
+        self.__converged = info == 0
+        count('IterativeSolver.iterations', self.iterations())
+        return x
+
+if __name__ == '__main__':
+
+    from Coefficients import Coefficients
+    from Diffusion import Diffusion1D
+    from Advection import Advection1D
+
+    nvx = 102
+    coef = Coefficients(nvx, 0.01)
+    coef.alloc(nvx)
+    dif = Diffusion1D(nvx, Gamma = 0.1, dx = 0.01, coef = coef)
+    dif.calcCoef()
+    adv = Advection1D(nvx, rho = 1.0, dx = 0.01, coef = coef)
+    adv.setU(2.5)
+    adv.calcCoef('Quick')
+    coef.bcDirichlet('LEFT_WALL', 1)
+    coef.bcDirichlet('RIGHT_WALL', 0)
+
+    A = Matrix(nvx, storage = 'banded')
+    A.build(coef)
+    exact = A.solve(coef.Su()[1:-1])
+    print('-' * 20)
+    for metodo, omega, precond in (('GaussSeidel', 1.0, None), ('SOR', 1.8, None),
+                                   ('TDMA', 1.0, None), ('BiCGSTAB', 1.0, 'jacobi'),
+                                   ('GMRES', 1.0, 'jacobi'), ('BiCGSTAB', 1.0, 'ilu')):
+        solver = IterativeSolver(metodo, tol = 1e-8, maxiter = 5000, omega = omega,
+                                 precond = precond)
+        phi = solver.solve(coef)
+        print('{:12s} iter = {:5d} residuo = {:10.3e} error = {:10.3e}'.format(
+              metodo, solver.iterations(), solver.residuals()[-1], np.max(np.abs(phi - exact))))
+    print('-' * 20)
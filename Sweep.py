@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Módulo para barridos de parámetros: cada caso se define con un diccionario y los casos se
+reparten en un pool de procesos (concurrent.futures). Los resultados (solución y normas del
+error calculado con calcError) se juntan en una sola tabla (diccionario de columnas, el mismo
+formato que usa printFrame y que acepta pandas.DataFrame).
+
+Un caso es un diccionario con las llaves:
+    nodes: número de nodos
+    length: longitud del dominio
+    stretching, ratio: estiramiento de la malla (opcionales, ver Mesh)
+    faces: coordenadas de las caras (opcional, en lugar de nodes y length; ver Mesh)
+    Gamma: coeficiente difusivo
+    rho: densidad (opcional, 1.0 por omisión)
+    u: velocidad (opcional, 0.0 por omisión; sin advección si es 0)
+    metodo: esquema advectivo (opcional, 'Upwind1' por omisión)
+    bc: condiciones de frontera {'LEFT_WALL': (tipo, valor), 'RIGHT_WALL': (tipo, valor)} con
+        tipo 'DIRICHLET' o 'NEUMMAN'
+    Su, Sp: fuentes (opcionales)
+    dtype: tipo de punto flotante de la malla, los coeficientes, la matriz y la solución
+           (opcional, float por omisión; np.float32 para corridas de exploración)
+    analytic: función analytic(x, case) con la solución analítica (opcional). Debe estar definida
+              a nivel de módulo para poder enviarse a los procesos.
+"""
+
+import itertools
+import time
+import numpy as np
+from Mesh import Mesh
+from Coefficients import Coefficients
+from Diffusion import Diffusion1D
+from Advection import Advection1D
+from Matrix import Matrix
+from Timer import timed, region
+
+PARAMETERS = ('nodes', 'length', 'Gamma', 'rho', 'u', 'metodo', 'stretching', 'ratio')
+
+def grid(**params):
+    """
+    Construye la lista de casos con el producto cartesiano de los valores dados. Los parámetros
+    que no son listas (o tuplas) se toman como fijos. Por ejemplo:
+        grid(nodes = [11, 21], u = [0.1, 2.5], Gamma = 0.1, length = 1.0, bc = {...})
+    """
+    keys = list(params)
+    values = [v if isinstance(v, (list, tuple)) else [v] for v in params.values()]
+    return [dict(zip(keys, combination)) for combination in itertools.product(*values)]
+
+def advective(case):
+    # True si el caso tiene advección; u puede ser un escalar o un arreglo por cara
+    return bool(np.any(np.asarray(case.get('u', 0.0)) != 0))
+
+def applyBC(coef, bc):
+    for wall, (tipo, valor) in bc.items():
+        if tipo == 'DIRICHLET':
+            coef.bcDirichlet(wall, valor)
+        elif tipo == 'NEUMMAN':
+            coef.bcNeumman(wall, valor)
+
+def fillBoundary(phi, bc, dx):
+    # Valores en las fronteras a partir de la solución en los volúmenes vecinos. phi puede tener
+    # varias columnas (nvx, k), una por lado derecho, con valores de frontera de k elementos
+    if np.ndim(dx) == 1 and np.ndim(phi) == 2:
+        dx = np.asarray(dx)[:,None]
+    dx = np.broadcast_to(dx, phi.shape)
+    for wall, (tipo, valor) in bc.items():
+        if wall == 'LEFT_WALL':
+            phi[0] = valor if tipo == 'DIRICHLET' else phi[1] - valor * dx[1] / 2
+        elif wall == 'RIGHT_WALL':
+            phi[-1] = valor if tipo == 'DIRICHLET' else phi[-2] + valor * dx[-2] / 2
+
+@timed()
+def assemble(case):
+    """
+    Crea la malla y los coeficientes (difusión, advección, fuentes y fronteras) de un caso.
+    Regresa (malla, coef).
+    """
+    malla = Mesh(nodes = case.get('nodes'), length = case.get('length'),
+                 stretching = case.get('stretching'), ratio = case.get('ratio', 1.0),
+                 faces = case.get('faces'), dtype = case.get('dtype', float))
+    nvx = malla.volumes()
+    delta = malla.delta()
+    coef = Coefficients(nvx, delta)
+    coef.alloc(nvx, dtype = case.get('dtype', float))
+    dif = Diffusion1D(nvx, Gamma = case['Gamma'], dx = delta, coef = coef)
+    dif.calcCoef()
+    if advective(case):
+        adv = Advection1D(nvx, rho = case.get('rho', 1.0), dx = delta, coef = coef)
+        u = case['u']
+        adv.setU(u if np.ndim(u) else float(u))
+        adv.calcCoef(case.get('metodo', 'Upwind1'))
+    if case.get('Su') is not None:
+        coef.setSu(case['Su'])
+    if case.get('Sp') is not None:
+        coef.setSp(case['Sp'])
+    applyBC(coef, case['bc'])
+    return malla, coef
+
+@timed()
+def solveCase(case, cache = None):
+    """
+    Resuelve un caso y regresa un diccionario con los parámetros, la malla, la solución, las
+    normas del error (si el caso tiene solución analítica) y el tiempo de cálculo. Si se da un
+    OperatorCache (ver Operators) el operador ensamblado y factorizado se toma del caché.
+    """
+    from FiniteVolumeMethod import calcError
+    t1 = time.time()
+    if cache is None:
+        malla, coef = assemble(case)
+        nvx = malla.volumes()
+        A = Matrix(nvx, storage = 'banded', dtype = coef.dtype())
+        A.build(coef)
+        phi = np.zeros(nvx, dtype = coef.dtype())
+        phi[1:-1] = A.solve(coef.Su()[1:-1])
+        fillBoundary(phi, case['bc'], malla.delta())
+        x = None
+    else:
+        op = cache.get(case)
+        phi = op.solve({wall: valor for wall, (tipo, valor) in case['bc'].items()},
+                       case.get('Su', 0.0))
+        x = op.x()
+    t2 = time.time()
+
+    with region('output'):
+        if x is None:
+            x = malla.createMesh()
+        result = {key: case.get(key) for key in PARAMETERS}
+        result['x'] = x
+        result['phi'] = phi
+        result['L2'] = np.nan
+        result['Linf'] = np.nan
+        if case.get('analytic'):
+            error = calcError(case['analytic'](x, case), phi)
+            result['L2'] = np.linalg.norm(error)
+            result['Linf'] = np.max(error)
+    result['Tiempo'] = t2 - t1
+    return result
+
+# Caché de operadores de cada proceso del pool (se crea en el primer caso)
+CACHE = None
+
+def solveCached(case):
+    global CACHE
+    if CACHE is None:
+        from Operators import OperatorCache
+        CACHE = OperatorCache()
+    return solveCase(case, CACHE)
+
+def runSweep(cases, workers = None, chunksize = 1, cache = False):
+    """
+    Resuelve todos los casos en un pool de procesos ('workers' procesos, por omisión uno por
+    núcleo) y regresa una tabla (diccionario de columnas) con un renglón por caso, en el orden de
+    'cases'. Con cache = True cada proceso guarda los operadores factorizados (OperatorCache) y
+    los reutiliza en los casos que sólo cambian en los valores de frontera o en Su; conviene
+    usar un 'chunksize' mayor que 1 para que casos consecutivos caigan en el mismo proceso.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    solver = solveCached if cache else solveCase
+    with ProcessPoolExecutor(max_workers = workers) as pool:
+        results = list(pool.map(solver, cases, chunksize = chunksize))
+    table = {}
+    for result in results:
+        for key, value in result.items():
+            table.setdefault(key, []).append(value)
+    return table
+
+def analyticAdvDiff(x, case):
+    # Solución analítica del ejemplo 5.1 de Malalasekera (Dirichlet en ambos extremos)
+    phi0 = case['bc']['LEFT_WALL'][1]
+    phiL = case['bc']['RIGHT_WALL'][1]
+    Pe = case.get('rho', 1.0) * case['u'] / case['Gamma']
+    return (np.exp(Pe * x) - 1) / (np.exp(Pe * case['length']) - 1) * (phiL - phi0) + phi0
+
+if __name__ == '__main__':
+
+    cases = grid(nodes = [6, 21], length = 1.0, Gamma = 0.1, rho = 1.0,
+                 u = [0.1, 2.5], metodo = ('Upwind1', 'DifCentrales', 'Quick'),
+                 bc = {'LEFT_WALL': ('DIRICHLET', 1), 'RIGHT_WALL': ('DIRICHLET', 0)},
+                 analytic = analyticAdvDiff)
+    assert len(cases) == 12
+    table = runSweep(cases)
+    for row in zip(*[table[key] for key in PARAMETERS + ('L2', 'Linf')]):
+        print(row)
+
+    # Fuentes por volumen (arreglos de nvx valores): igual que las fuentes constantes
+    fin = {'nodes': 11, 'length': 1.0, 'Gamma': 1.0, 'Su': 10.0, 'Sp': -25.0,
+           'bc': {'LEFT_WALL': ('DIRICHLET', 100.0), 'RIGHT_WALL': ('NEUMMAN', 0.0)}}
+    phi = solveCase(fin)['phi']
+    phiArray = solveCase(dict(fin, Su = np.full(12, 10.0), Sp = np.full(12, -25.0)))['phi']
+    print('Fuentes por volumen, diferencia = %.1e' % np.max(np.abs(phi - phiArray)))
+    assert np.allclose(phi, phiArray)
+
+    # Velocidad por cara (nvx-1 valores): igual que la velocidad constante
+    caso = dict(cases[-1], nodes = 11, analytic = None)
+    phi = solveCase(caso)['phi']
+    phiArray = solveCase(dict(caso, u = np.full(11, caso['u'])))['phi']
+    print('Velocidad por cara, diferencia = %.1e' % np.max(np.abs(phi - phiArray)))
+    assert np.allclose(phi, phiArray)
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+
+class Timers():
+    """
+    Clase con cronómetros con nombre que se pueden anidar y contadores, para saber qué etapa del
+    cálculo (coeficientes, fronteras, construcción de la matriz, solución, salida) toma más tiempo.
+    Cada región se identifica por su ruta en el árbol de llamadas ('solveCase/Matrix.solve'), así
+    que la misma función se reporta por separado según desde dónde se llame.
+
+    Desactivados (por omisión), region() regresa un contexto vacío que ya existe y los métodos
+    decorados con timed() sólo revisan una bandera antes de llamar a la función, así que el costo
+    es despreciable. Se activan con enable() o con la variable de ambiente FVM_TIMERS=1 (en ese
+    caso el reporte se imprime al terminar el programa).
+
+    Cada hilo tiene su propia pila de regiones abiertas, así que las regiones de hilos distintos
+    no se anidan entre sí; los totales y contadores son de todos los hilos (se actualizan con un
+    candado) y en la traza cada región lleva el hilo que la midió.
+
+    Métodos:
+        constructor(enabled): crea los cronómetros (activados o no)
+        enable(flag): activa o desactiva la medición
+        enabled(): True si la medición está activa
+        reset(): borra todas las mediciones
+        region(name): contexto que mide el tiempo de la región 'name' (with timers.region(...))
+        start(name), stop(): inicio y fin de una región sin usar 'with'
+        timed(name): decorador que mide cada llamada a la función (por omisión con su nombre)
+        count(name,n): suma n al contador 'name'
+        totals(): get diccionario {ruta: [llamadas, tiempo total]}
+        counters(): get diccionario {nombre: cuenta}
+        report(): imprime el árbol de regiones (tiempo total, propio, llamadas y % del total)
+                  y los contadores
+        exportJSON(path): guarda las regiones en formato de trazas de Chrome (chrome://tracing,
+                          Perfetto) junto con los totales y los contadores
+
+    Atributos:
+        enabled: bandera de medición
+        stack: regiones abiertas (ruta y tiempo de inicio) de cada hilo (threading.local)
+        totals: llamadas y tiempo total por ruta
+        counters: contadores
+        events: regiones medidas para la traza (a lo más maxEvents)
+    """
+
+    def __init__(self, enabled = False, maxEvents = 100000):
+        self.__enabled = enabled
+        self.__maxEvents = maxEvents
+        self.__null = _NullRegion()
+        self.__lock = threading.Lock()
+        self.reset()
+
+    def enable(self, flag = True):
+        self.__enabled = flag
+
+    def enabled(self):
+        return self.__enabled
+
+    def reset(self):
+        self.__local = threading.local()
+        self.__totals = {}
+        self.__counters = {}
+        self.__events = []
+        self.__t0 = time.perf_counter()
+
+    def totals(self):
+        return self.__totals
+
+    def counters(self):
+        return self.__counters
+
+    def __stack(self):
+        # Pila de regiones abiertas del hilo actual
+        stack = getattr(self.__local, 'stack', None)
+        if stack is None:
+            stack = self.__local.stack = []
+        return stack
+
+    def start(self, name):
+        stack = self.__stack()
+        path = stack[-1][0] + '/' + name if stack else name
+        # La ruta se registra al abrirla para que el reporte quede en orden de llamada
+        with self.__lock:
+            self.__totals.setdefault(path, [0, 0.0])
+        stack.append((path, time.perf_counter()))
+
+    def stop(self):
+        t = time.perf_counter()
+        path, t1 = self.__stack().pop()
+        with self.__lock:
+            total = self.__totals[path]
+            total[0] += 1
+            total[1] += t - t1
+            if len(self.__events) < self.__maxEvents:
+                self.__events.append((path, threading.get_ident(), t1, t - t1))
+
+    def region(self, name):
+        if not self.__enabled:
+            return self.__null
+        return _Region(self, name)
+
+    def timed(self, name = None):
+        def decorate(f):
+            label = name or f.__qualname__
+            @functools.wraps(f)
+            def wrapper(*args, **kargs):
+                if not self.__enabled:
+                    return f(*args, **kargs)
+                self.start(label)
+                try:
+                    return f(*args, **kargs)
+                finally:
+                    self.stop()
+            return wrapper
+        return decorate
+
+    def count(self, name, n = 1):
+        if self.__enabled:
+            with self.__lock:
+                self.__counters[name] = self.__counters.get(name, 0) + n
+
+    def __self(self, path, total):
+        # Tiempo propio: total menos el de las regiones hijas directas
+        children = sum(t for p, (c, t) in self.__totals.items()
+                       if p.startswith(path + '/') and '/' not in p[len(path) + 1:])
+        return total - children
+
+    def report(self):
+        line = '-' * 70
+        wall = sum(t for p, (c, t) in self.__totals.items() if '/' not in p) or 1.0
+        print('.' + line + '.')
+        print('|{:40s}{:>9s}{:>9s}{:>7s}{:>5s}|'.format(' Region', 'Total', 'Propio', 'Llam.', '%'))
+        print('.' + line + '.')
+        for path, (calls, total) in self.__totals.items():
+            depth = path.count('/')
+            name = ' ' + '  ' * depth + path.split('/')[-1]
+            print('|{:40.40s}{:9.2e}{:9.2e}{:7d}{:5.0f}|'.format(
+                  name, total, self.__self(path, total), calls, 100 * total / wall))
+        if self.__counters:
+            print('.' + line + '.')
+            for name, n in self.__counters.items():
+                print('|{:40.40s}{:>30}|'.format(' ' + name, n))
+        print('.' + line + '.')
+
+    def exportJSON(self, path):
+        # Eventos completos ('X') con tiempos en microsegundos, numerando los hilos en orden de
+        # aparición
+        pid = os.getpid()
+        tids = {}
+        events = [{'name': p.split('/')[-1], 'cat': p, 'ph': 'X', 'pid': pid,
+                   'tid': tids.setdefault(tid, len(tids)), 'ts': 1e6 * (t1 - self.__t0),
+                   'dur': 1e6 * dt}
+                  for p, tid, t1, dt in self.__events]
+        trace = {'traceEvents': events,
+                 'totals': {p: {'calls': c, 'time': t} for p, (c, t) in self.__totals.items()},
+                 'counters': self.__counters}
+        with open(path, 'w') as f:
+            json.dump(trace, f)
+
+class _Region():
+    def __init__(self, timers, name):
+        self.__timers = timers
+        self.__name = name
+
+    def __enter__(self):
+        self.__timers.start(self.__name)
+        return self
+
+    def __exit__(self, *exc):
+        self.__timers.stop()
+        return False
+
+class _NullRegion():
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+# Cronómetros compartidos por todos los módulos
+TIMERS = Timers(enabled = os.environ.get('FVM_TIMERS', '0') not in ('', '0'))
+region = TIMERS.region
+timed = TIMERS.timed
+count = TIMERS.count
+if TIMERS.enabled():
+    atexit.register(TIMERS.report)
+
+if __name__ == '__main__':
+
+    t = Timers(enabled = True)
+
+    @t.timed()
+    def coeficientes():
+        time.sleep(0.01)
+
+    for i in range(3):
+        with t.region('paso'):
+            coeficientes()
+            with t.region('solucion'):
+                time.sleep(0.02)
+                t.count('iteraciones', 5)
+    t.report()
+
+    # Regiones en varios hilos: cada hilo anida sólo sus propias regiones
+    t.reset()
+    def trabajo():
+        for i in range(100):
+            with t.region('hilo'):
+                with t.region('calculo'):
+                    t.count('pasos')
+    hilos = [threading.Thread(target = trabajo) for i in range(4)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    t.report()
+    assert set(t.totals()) == {'hilo', 'hilo/calculo'}
+    assert t.totals()['hilo'][0] == t.totals()['hilo/calculo'][0] == t.counters()['pasos'] == 400
@@ -0,0 +1,465 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import warnings
+import numpy as np
+from Matrix import Matrix
+from Kernels import kernel
+from Timer import timed, count
+
+def writerList(writer):
+    # Permite pasar un objeto de salida, una lista de ellos o None
+    if writer is None:
+        return ()
+    return tuple(writer) if isinstance(writer, (list, tuple)) else (writer,)
+
+def precisionError(case, dtype = np.float32, steps = 0, dt = None, metodo = 'Forward'):
+    """
+    Compara la solución de un caso (diccionario con el formato de Sweep) calculada con el tipo
+    'dtype' contra la de float64. Con steps = 0 se compara la solución estacionaria; si no, la
+    de avanzar 'steps' pasos desde phi = case['phi0'] (0 por omisión, con los valores de las
+    fronteras DIRICHLET) con el esquema 'metodo' y el paso dt (por omisión 0.9 del paso estable
+    del esquema explícito). Regresa un diccionario con el error máximo, el error relativo (norma
+    L2 de la diferencia entre la de la solución de float64) y la memoria de los coeficientes y la
+    solución con cada tipo.
+    """
+    from Sweep import assemble, solveCase
+    phis = []
+    nbytes = []
+    for d in (np.float64, dtype):
+        c = dict(case, dtype = d)
+        if steps:
+            malla, coef = assemble(c)
+            phi = np.full(malla.volumes(), case.get('phi0', 0.0), dtype = d)
+            for wall, (tipo, valor) in case['bc'].items():
+                if tipo == 'DIRICHLET':
+                    phi[0 if wall == 'LEFT_WALL' else -1] = valor
+            integ = TimeIntegrator(coef, rho = case.get('rho', 1.0), dx = malla.delta(),
+                                   dt = 1.0, phi = phi, metodo = metodo)
+            if dt is None:
+                dt = 0.9 * TimeIntegrator(coef, rho = case.get('rho', 1.0), dx = malla.delta(),
+                                          dt = 1.0, phi = phi).stableDt()
+            integ.setDt(dt)
+            phi = integ.step(steps)
+            nbytes.append(sum(a.nbytes for a in coef.arrays().values()) + phi.nbytes)
+        else:
+            phi = solveCase(c)['phi']
+            # Seis arreglos de coeficientes y la solución, todos de nvx valores
+            nbytes.append(7 * phi.nbytes)
+        phis.append(phi)
+    ref, phi = phis
+    diff = phi.astype(np.float64) - ref
+    return {'dtype': np.dtype(dtype).name, 'Linf': np.max(np.abs(diff)),
+            'rel': np.linalg.norm(diff) / (np.linalg.norm(ref) or 1.0),
+            'nbytes64': nbytes[0], 'nbytes': nbytes[1]}
+
+class TimeIntegrator():
+    """
+    Clase que avanza en el tiempo la solución phi del problema no estacionario
+
+        rho * dx * (phi^{n+1} - phi^n) / dt = Su - A (theta phi^{n+1} + (1 - theta) phi^n)
+
+    donde A es la matriz pentadiagonal (aP, -aE, -aW, -aEE, -aWW) construida a partir de los
+    coeficientes (ya con las condiciones de frontera) de un objeto Coefficients. Los esquemas
+    posibles son:
+        'Forward' (theta = 0): explícito; la actualización de todo el arreglo se hace con
+                   operaciones vectorizadas en el lugar, usando dos arreglos de trabajo que se
+                   reservan una sola vez (o con el kernel compilado si el backend es 'numba',
+                   ver Kernels).
+        'Backward' (theta = 1) y 'CrankNicolson' (theta = 1/2): implícitos; la matriz
+                   (I + theta dt/(rho dx) A) es constante, así que se factoriza (LU por bandas de
+                   LAPACK) una sola vez en el constructor y en cada paso sólo se actualiza el lado
+                   derecho y se hace la sustitución en el mismo arreglo de trabajo, O(N) por paso,
+                   sin reservar memoria y sin límite de estabilidad para dt.
+    Las fronteras (phi[0] y phi[-1]) no se modifican; su efecto ya está en aP y Su, igual que en la
+    matriz del problema estacionario (ver Matrix).
+
+    Métodos:
+        constructor(coef,rho,dx,dt,phi,metodo,dtype): recibe los coeficientes, la densidad, el
+                                         tamaño de los volúmenes, el paso de tiempo, la condición
+                                         inicial (arreglo de nvx valores, incluyendo fronteras), el
+                                         esquema y el tipo de punto flotante de la solución y de los
+                                         arreglos de trabajo (por omisión el de los coeficientes)
+        step(n,writer): avanza n pasos de tiempo; si se da un SnapshotWriter o un Checkpoint (ver
+                        Output), o una lista de ellos, se les pasa la solución después de cada paso
+        phi(): get solución actual (incluyendo fronteras)
+        time(): get tiempo actual
+        steps(): get número de pasos dados
+        metodo(): get esquema temporal
+        dt(): get paso de tiempo
+        rho(): get densidad
+        dx(): get tamaño de los volúmenes interiores
+        dtype(): get tipo de punto flotante de la solución
+        setDt(dt): set paso de tiempo (en los esquemas implícitos se vuelve a factorizar la matriz,
+                   guardando las últimas factorizaciones por si se regresa a un dt anterior)
+        setTime(t): set tiempo actual
+        setSteps(n): set número de pasos dados (para continuar una simulación)
+        order(): orden de precisión temporal del esquema (1 o 2)
+        stableDt(): paso de tiempo máximo que mantiene positivo el coeficiente de phi_P^n,
+                    rho dx / dt - (1 - theta) aP >= 0 (criterio de acotamiento; incluye los
+                    límites de CFL y del número de difusión). Es infinito para 'Backward'.
+
+    Atributos:
+        phi: solución actual
+        metodo: esquema temporal ('Forward', 'Backward' o 'CrankNicolson')
+        theta: peso implícito del esquema
+        dt: paso de tiempo
+        t: tiempo actual
+        c: factor dt / (rho * dx)
+    """
+
+    THETA = {'Forward': 0.0, 'Backward': 1.0, 'CrankNicolson': 0.5}
+
+    def __init__(self, coef = None, rho = None, dx = None, dt = None, phi = None,
+                 metodo = 'Forward', dtype = None):
+        self.__diagonals = Matrix.diagonals(coef)
+        self.__dWW, self.__dW, self.__dP, self.__dE, self.__dEE = self.__diagonals
+        self.__Su = coef.Su()[1:-1]
+        self.__rho = rho
+        # En mallas no uniformes dx es un arreglo por volumen; sólo se usan los interiores
+        self.__dx = dx[1:-1] if np.ndim(dx) else dx
+        self.__dtype = coef.aP().dtype if dtype is None else np.dtype(dtype)
+        self.__dt = dt
+        self.__c = self.__factor(dt)
+        self.__metodo = metodo
+        self.__theta = TimeIntegrator.THETA[metodo]
+        # Parte implícita de la fuente (constante), theta * Su
+        self.__thetaSu = (self.__theta * self.__Su).astype(self.__dtype)
+        self.__phi = np.array(phi, dtype = self.__dtype)
+        self.__t = 0.0
+        self.__steps = 0
+        N = self.__phi.size - 2
+        # Arreglos de trabajo reservados una sola vez: residuo y producto temporal
+        self.__r = np.empty(N, dtype = self.__dtype)
+        self.__tmp = np.empty(N, dtype = self.__dtype)
+        self.__lu = None
+        self.__factors = {}
+        if self.__theta > 0:
+            self.__factorize()
+
+    def __factor(self, dt):
+        # c = dt / (rho dx), con el tipo de la solución si es un arreglo
+        c = dt / (self.__rho * self.__dx)
+        return c.astype(self.__dtype) if np.ndim(c) else c
+
+    def __factorize(self):
+        # Matriz constante I + theta * c * A, se factoriza una sola vez para cada dt
+        if self.__dt in self.__factors:
+            self.__lu = self.__factors[self.__dt]
+            return
+        from scipy.linalg import get_lapack_funcs
+        gbtrf, gbtrs = get_lapack_funcs(('gbtrf', 'gbtrs'), dtype = self.__dtype)
+        N = self.__phi.size - 2
+        s = np.broadcast_to(self.__theta * self.__c, (N,))
+        dWW, dW, dP, dE, dEE = self.__diagonals
+        # Formato por bandas de LAPACK: el de Matrix con dos renglones más arriba para el
+        # llenado del pivoteo, M[4 + i - j, j] = m[i, j] (cada renglón i escalado por s[i])
+        M = np.zeros((7, N), dtype = self.__dtype)
+        M[2,2:] = s[:-2] * dEE
+        M[3,1:] = s[:-1] * dE
+        M[4] = 1 + s * dP
+        M[5,:-1] = s[1:] * dW
+        M[6,:-2] = s[2:] * dWW
+        lu, piv, info = gbtrf(M, 2, 2, overwrite_ab = 1)
+        if info != 0:
+            raise np.linalg.LinAlgError('TimeIntegrator: matriz singular (gbtrf info = {})'
+                                        .format(info))
+        self.__lu = (gbtrs, lu, piv)
+        if len(self.__factors) >= 4:
+            self.__factors.pop(next(iter(self.__factors)))
+        self.__factors[self.__dt] = self.__lu
+
+    def setDt(self, dt):
+        if dt == self.__dt:
+            return
+        self.__dt = dt
+        self.__c = self.__factor(dt)
+        if self.__theta > 0:
+            self.__factorize()
+
+    def setTime(self, t):
+        self.__t = t
+
+    def setSteps(self, n):
+        self.__steps = n
+
+    def rho(self):
+        return self.__rho
+
+    def dx(self):
+        return self.__dx
+
+    def dtype(self):
+        return self.__dtype
+
+    def order(self):
+        return 2 if self.__metodo == 'CrankNicolson' else 1
+
+    def stableDt(self):
+        if self.__theta == 1:
+            return np.inf
+        return np.min(self.__rho * self.__dx / ((1 - self.__theta) * self.__dP))
+
+    def metodo(self):
+        return self.__metodo
+
+    def phi(self):
+        return self.__phi
+
+    def time(self):
+        return self.__t
+
+    def steps(self):
+        return self.__steps
+
+    def dt(self):
+        return self.__dt
+
+    def __residual(self, p):
+        # r = Su - A p, sin crear arreglos nuevos
+        r = self.__r
+        tmp = self.__tmp
+        np.multiply(self.__dP, p, out = tmp)
+        np.subtract(self.__Su, tmp, out = r)
+        np.multiply(self.__dE, p[1:], out = tmp[:-1])
+        r[:-1] -= tmp[:-1]
+        np.multiply(self.__dW, p[:-1], out = tmp[1:])
+        r[1:] -= tmp[1:]
+        np.multiply(self.__dEE, p[2:], out = tmp[:-2])
+        r[:-2] -= tmp[:-2]
+        np.multiply(self.__dWW, p[:-2], out = tmp[2:])
+        r[2:] -= tmp[2:]
+        return r
+
+    @timed()
+    def step(self, n = 1, writer = None):
+        p = self.__phi[1:-1]
+        theta = self.__theta
+        writers = writerList(writer)
+        loop = kernel('explicit') if theta == 0 else None
+        if loop is not None:
+            c = np.broadcast_to(self.__c, p.shape)
+        for i in range(n):
+            if loop is not None:
+                loop(p, self.__Su, self.__dWW, self.__dW, self.__dP, self.__dE, self.__dEE, c,
+                     self.__r)
+            elif theta == 0:
+                r = self.__residual(p)
+                r *= self.__c
+                p += r
+            else:
+                # Lado derecho: phi^n + c ((1 - theta) (Su - A phi^n) + theta Su)
+                if theta < 1:
+                    r = self.__residual(p)
+                    r *= 1 - theta
+                else:
+                    r = self.__r
+                    r.fill(0)
+                r += self.__thetaSu
+                r *= self.__c
+                r += p
+                # Sustitución en el lugar (r es contiguo, así que gbtrs escribe la solución en r)
+                gbtrs, lu, piv = self.__lu
+                x, info = gbtrs(lu, 2, 2, r[:,None], piv, overwrite_b = 1)
+                p[:] = x[:,0]
+            self.__t += self.__dt
+            self.__steps += 1
+            for w in writers:
+                w.record(self.__t, self.__phi, self.__steps)
+        count('TimeIntegrator.steps', n)
+        return self.__phi
+
+class TimeController():
+    """
+    Clase que controla el paso de tiempo de un TimeIntegrator. El paso se adapta con una
+    estimación del error local por duplicación de paso (un paso dt contra dos pasos dt/2):
+
+        err = max|phi_{dt/2,dt/2} - phi_dt| / (2^p - 1)
+
+    Si err <= tol * max(1, max|phi|) el paso se acepta (con la solución de los dos medios pasos) y
+    el siguiente dt se escala por safety * (tol/err)^(1/(p+1)); si no, se rechaza y se repite con
+    un dt menor. En el esquema explícito dt nunca supera stableDt(). Los pasos se recortan para
+    llegar exactamente a los tiempos de salida pedidos. El contador de pasos del integrador
+    (steps()) sólo cuenta los pasos aceptados. Si el paso ya es dtMin y el error sigue arriba de
+    la tolerancia el paso se acepta de todos modos, con un RuntimeWarning, y se cuenta en
+    forced(); si el error no es finito (la solución divergió) se regresa a la solución anterior
+    y se lanza FloatingPointError.
+
+    Métodos:
+        constructor(integrator,tol,safety,dtMin,dtMax,writer): recibe el integrador, los parámetros
+                  del control del error y (opcional) un SnapshotWriter o Checkpoint (o una lista
+                  de ellos) al que se le pasa la solución después de cada paso aceptado
+        advance(tEnd): avanza hasta el tiempo tEnd (exacto) y regresa phi
+        run(times): generador que regresa (t, phi) en cada uno de los tiempos de salida
+        accepted(): get número de pasos aceptados
+        rejected(): get número de pasos rechazados
+        forced(): get número de pasos aceptados con dtMin sin cumplir la tolerancia
+        history(): get lista con los pasos de tiempo aceptados
+
+    Atributos:
+        integrator: objeto TimeIntegrator
+        tol: tolerancia del error local
+        safety: factor de seguridad para el nuevo paso
+        dtMin, dtMax: límites del paso de tiempo
+        writer: salida de las soluciones
+    """
+
+    def __init__(self, integrator = None, tol = 1e-3, safety = 0.9, dtMin = 0.0, dtMax = np.inf,
+                 writer = None):
+        self.__integrator = integrator
+        self.__writers = writerList(writer)
+        self.__tol = tol
+        self.__safety = safety
+        self.__dtMin = dtMin
+        if integrator.metodo() == 'Forward':
+            dtMax = min(dtMax, integrator.stableDt())
+        self.__dtMax = dtMax
+        self.__dt = min(integrator.dt(), self.__dtMax)
+        self.__accepted = 0
+        self.__rejected = 0
+        self.__forced = 0
+        self.__history = []
+        N = integrator.phi().size - 2
+        self.__saved = np.empty(N)
+        self.__full = np.empty(N)
+
+    def accepted(self):
+        return self.__accepted
+
+    def rejected(self):
+        return self.__rejected
+
+    def forced(self):
+        return self.__forced
+
+    def history(self):
+        return self.__history
+
+    def __trial(self, dt):
+        # Regresa el error estimado de avanzar dt; deja en el integrador la solución de dos medios pasos
+        # y el contador de pasos como estaba (advance lo incrementa sólo si el paso se acepta)
+        integ = self.__integrator
+        phi = integ.phi()[1:-1]
+        t = integ.time()
+        steps = integ.steps()
+        self.__saved[:] = phi
+        integ.setDt(dt)
+        integ.step()
+        self.__full[:] = phi
+        phi[:] = self.__saved
+        integ.setTime(t)
+        integ.setDt(dt / 2)
+        integ.step(2)
+        integ.setSteps(steps)
+        self.__full -= phi
+        return np.max(np.abs(self.__full)) / (2 ** integ.order() - 1)
+
+    @timed()
+    def advance(self, tEnd):
+        integ = self.__integrator
+        p = integ.order()
+        while integ.time() < tEnd:
+            t = integ.time()
+            dt = min(self.__dt, tEnd - t)
+            err = self.__trial(dt)
+            if not np.isfinite(err):
+                integ.phi()[1:-1] = self.__saved
+                integ.setTime(t)
+                raise FloatingPointError('TimeController: error no finito en t = {:g} con '
+                                         'dt = {:g}'.format(t, dt))
+            scale = self.__tol * max(1.0, np.max(np.abs(integ.phi())))
+            factor = self.__safety * (scale / err) ** (1.0 / (p + 1)) if err > 0 else 5.0
+            factor = min(5.0, max(0.2, factor))
+            if err > scale and dt <= self.__dtMin:
+                self.__forced += 1
+                count('TimeController.forced')
+                warnings.warn('TimeController: paso dtMin = {:g} aceptado en t = {:g} con error '
+                              '{:.3e} > {:.3e}'.format(self.__dtMin, t, err, scale),
+                              RuntimeWarning, stacklevel = 2)
+            if err <= scale or dt <= self.__dtMin:
+                self.__accepted += 1
+                integ.setSteps(integ.steps() + 1)
+                self.__history.append(dt)
+                if dt == tEnd - t:
+                    integ.setTime(tEnd)
+                # Si el paso se recortó para llegar a tEnd sólo se ajusta dt cuando hay que reducirlo
+                if dt == self.__dt or factor < 1:
+                    self.__dt = min(self.__dtMax, max(self.__dtMin, dt * factor))
+                for w in self.__writers:
+                    w.record(integ.time(), integ.phi(), integ.steps())
+            else:
+                self.__rejected += 1
+                count('TimeController.rejected')
+                integ.phi()[1:-1] = self.__saved
+                integ.setTime(t)
+                self.__dt = max(self.__dtMin, dt * factor)
+        return integ.phi()
+
+    def run(self, times):
+        for t in times:
+            yield t, self.advance(t)
+
+if __name__ == '__main__':
+
+    from Coefficients import Coefficients
+    from Diffusion import Diffusion1D
+
+    # Difusión pura con phi = 1 a la izquierda y 0 a la derecha: tiende a la recta
+    nvx = 12
+    coef = Coefficients(nvx, 0.1)
+    coef.alloc(nvx)
+    dif = Diffusion1D(nvx, Gamma = 0.01, dx = 0.1, coef = coef)
+    dif.calcCoef()
+    coef.bcDirichlet('LEFT_WALL', 1)
+    coef.bcDirichlet('RIGHT_WALL', 0)
+
+    phi = np.zeros(nvx)
+    phi[0] = 1
+    ti = TimeIntegrator(coef, rho = 1.0, dx = 0.1, dt = 0.1, phi = phi)
+    print(ti.step(10), ti.time(), sep = '\n')
+    print('-' * 20)
+    print(ti.step(2000), ti.time(), sep = '\n')
+    print('-' * 20)
+
+    # Con los esquemas implícitos el paso puede ser mucho mayor que el límite explícito
+    for metodo in ('Backward', 'CrankNicolson'):
+        ti = TimeIntegrator(coef, rho = 1.0, dx = 0.1, dt = 10.0, phi = phi, metodo = metodo)
+        print(metodo, ti.step(20), ti.time(), sep = '\n')
+        print('-' * 20)
+
+    # Paso adaptativo con salida en tiempos exactos
+    ti = TimeIntegrator(coef, rho = 1.0, dx = 0.1, dt = 0.1, phi = phi)
+    control = TimeController(ti, tol = 1e-4)
+    print('dt estable = ', ti.stableDt())
+    for t, p in control.run([1.0, 10.0, 100.0]):
+        print(t, p)
+    print(control.accepted(), control.rejected())
+    print('-' * 20)
+
+    # Con dtMin demasiado grande para la tolerancia los pasos se aceptan con aviso y se cuentan;
+    # una solución que no es finita detiene el avance
+    ti = TimeIntegrator(coef, rho = 1.0, dx = 0.1, dt = 0.5, phi = phi, metodo = 'Backward')
+    control = TimeController(ti, tol = 1e-8, dtMin = 0.5)
+    with warnings.catch_warnings(record = True) as avisos:
+        warnings.simplefilter('always')
+        control.advance(2.0)
+    print(control.accepted(), control.forced(), len(avisos))
+    assert control.forced() == control.accepted() == len(avisos) == 4
+    nan = phi.copy()
+    nan[5] = np.nan
+    control = TimeController(TimeIntegrator(coef, rho = 1.0, dx = 0.1, dt = 0.1, phi = nan))
+    try:
+        control.advance(1.0)
+        raise AssertionError('se aceptó una solución con NaN')
+    except FloatingPointError as e:
+        print(e)
+    print('-' * 20)
+
+    # Error de float32 contra float64 (advección-difusión como en ejemplo-Forward)
+    case = {'nodes': 351, 'length': 2.5, 'Gamma': 0.1, 'u': 1.0, 'metodo': 'Upwind1',
+            'bc': {'LEFT_WALL': ('DIRICHLET', 1.0), 'RIGHT_WALL': ('DIRICHLET', 0.0)}}
+    for steps, metodo in ((0, None), (500, 'Forward'), (500, 'Backward'), (500, 'CrankNicolson')):
+        report = precisionError(case, np.float32, steps = steps, metodo = metodo or 'Forward')
+        print('%-14s %s  Linf = %.2e  rel = %.2e  memoria = %d / %d bytes' %
+              (metodo or 'Estacionario', report['dtype'], report['Linf'], report['rel'],
+               report['nbytes'], report['nbytes64']))
@@ -6,13 +6,13 @@ La solución se obtiene con el esquema forward para la parte temporal y upwind d
 
 """
 
+import sys
 import FiniteVolumeMethod as fvm
 import numpy as np
-import matplotlib.pyplot as plt
-from scipy.special import erfc
 
 #Se define la función que representa la solución analítica
 def analyticSol(x,t):
+    from scipy.special import erfc
     return 0.5*( erfc( (x-t)/(2*(Gamma*t)**0.5) ) + np.exp(u*x/Gamma)*erfc( (x+t)/(2*(Gamma*t)**0.5) )  )
 
 #-------------Se establecen los parámetros iniciales que definen el problema ---------------------
@@ -26,10 +26,11 @@ phiL = 0 #
 N = 351 # Número de nodos
 #valores iniciales del tiempo
 t_max=1.0  #s
-dt=0.002 #s
-n_tiempos=t_max/dt+1
-tiempos=np.arange(0,t_max+dt,dt) #arreglo que contiene los valores de tiempo donde se evalúa la solución
-n_tiempos=len(tiempos)
+dt=0.002 #s (paso inicial; el controlador lo ajusta y lo limita al paso estable)
+tol=1e-3 # tolerancia del error local en cada paso
+tiempos=np.linspace(0,t_max,5)[1:] #tiempos donde se grafica la solución
+salidas=100 # número de soluciones que se guardan en disco (historia completa)
+directorio = sys.argv[1] if len(sys.argv) > 1 else 'salida-Forward' # directorio de la historia
 #------------------------------------------------------
 
 
@@ -55,14 +56,13 @@ fvm.printData(Longitud = L,
 #
 # Se aloja memoria para los coeficientes
 #
-coef = fvm.Coefficients()
+coef = fvm.Coefficients(nvx, delta)
 coef.alloc(nvx)
-#fvm.Coefficients.alloc(nvx)
 #
 #  Calculamos los coeficientes de FVM de la Difusión
 
 
-dif = fvm.Diffusion1D(nvx, Gamma = Gamma, dx = delta)
+dif = fvm.Diffusion1D(nvx, Gamma = Gamma, dx = delta, coef = coef)
 dif.calcCoef()
 
 #--------------------------------------------------------------------------------
@@ -77,7 +77,7 @@ dif.calcCoef()
 
 #  Calculamos los coeficientes de FVM de la Advección
 #
-adv = fvm.Advection1D(nvx, rho = rho, dx = delta)
+adv = fvm.Advection1D(nvx, rho = rho, dx = delta, coef = coef)
 adv.setU(u)
 adv.calcCoef('Upwind1') 
 
@@ -120,43 +120,39 @@ Su = coef.Su()  # Vector del lado derecho
 #                Comienza el método foreward
 # ------------------------------------------------------------------------------
 
-#--------------Extraemos los coeficientes para su manipulación -------------
-aP=dif.aP()
-aE=dif.aE()
-aW=dif.aW()
-aEE=dif.aEE()
-aWW=dif.aWW()
-Su=dif.Su()
-aE[-2]=0
-aW[1]=0
+#--------------Integrador temporal (actualización vectorizada en el lugar) -----------
+integrador = fvm.TimeIntegrator(coef, rho = rho, dx = delta, dt = dt, phi = phi)
+#--------------Historia de la solución en disco (memoria mapeada, sin crecer en RAM) ---------
+writer = fvm.SnapshotWriter(directorio, malla.createMesh(), snapshots = salidas + 1,
+                            interval = t_max / salidas)
+writer.record(integrador.time(), integrador.phi())
+control = fvm.TimeController(integrador, tol = tol, writer = writer)
+print('dt estable = {:10.5e}'.format(integrador.stableDt()))
+print('.'+'-'*70+'.')
 
 
-#-------------------Ciclo iterativo que modela el método foreward-----------------------
-k=1
+#-------------------Ciclo con paso adaptativo que llega a cada tiempo de salida-----------
+# matplotlib se importa hasta que se necesita para graficar
+import matplotlib.pyplot as plt
 x1 = np.linspace(0,L,350)
 x = malla.createMesh()
-for i in range(1,n_tiempos):
-        
-    t=tiempos[i]
+for t, phi in control.run(tiempos):
     phi_a = analyticSol(x1,t)
-      
-    nphi=np.copy(phi)
-    for l in range(1,len(phi)-1):
-        nphi[l]= (dt/(rho*delta)) * ((-aP[l]+rho*delta/dt)*phi[l]+aE[l]*phi[l+1]+aW[l]*phi[l-1]+ Su[l]   )
-    phi = nphi
-    #-------------Graficación (de sólo 4 pasos temporales) ----------------------------
-    if i == int(k*(n_tiempos-1)/4):
-              
-        plt.plot(x1,phi_a, '-', label = 'Sol. analítica %.2f' %t) 
-        plt.plot(x,phi,'--o', label = 'Sol. numérica')
-        plt.title('Solución de $\partial(p u \phi)/\partial x= \partial (\Gamma \partial\phi/\partial x)/\partial x$ con dt=%1.2e' %dt)
-        plt.xlabel('$x$ [m]')
-        plt.ylabel('$\phi$ [...]')
-        plt.grid()
-        plt.legend()
-        #plt.savefig('example04.pdf')
-        plt.show()
-        k=k+1
+    #-------------Graficación (de sólo 4 tiempos) ----------------------------
+    plt.plot(x1,phi_a, '-', label = 'Sol. analítica %.2f' %t) 
+    plt.plot(x,phi,'--o', label = 'Sol. numérica')
+    plt.title('Solución de $\partial(p u \phi)/\partial x= \partial (\Gamma \partial\phi/\partial x)/\partial x$ con tol=%1.2e' %tol)
+    plt.xlabel('$x$ [m]')
+    plt.ylabel('$\phi$ [...]')
+    plt.grid()
+    plt.legend()
+    #plt.savefig('example04.pdf')
+    plt.show()
+
+print('Pasos aceptados = {}, rechazados = {}'.format(control.accepted(), control.rejected()))
+writer.close()
+print('Soluciones guardadas en {}/ = {}'.format(directorio, writer.written()))
+print('.'+'-'*70+'.')
 
 
 
@@ -32,7 +32,6 @@ T = 800 * x + 100
 
 import FiniteVolumeMethod as fvm
 import numpy as np
-import matplotlib.pyplot as plt
 
 #-------------Definición de datos iniciales ----------------
 longitud = 0.5 # meters
@@ -86,9 +85,9 @@ print('A = ', A.mat(),
       'b = {}'.format(Su[1:-1]), sep='\n')
 print('.'+'-'*70+'.')
 #
-# Se resuelve el sistema usando un algoritmo del módulo linalg
+# Se resuelve el sistema (linalg para 'dense', solve_banded para 'banded')
 #
-T[1:-1] = np.linalg.solve(A.mat(),Su[1:-1])
+T[1:-1] = A.solve(Su[1:-1])
 print('Solución = {}'.format(T))
 print('.'+'-'*70+'.')
 #
@@ -105,6 +104,8 @@ Ta = 800 * x + 100
 x *= 100 # Transformación a [cm]
 
 #---------------Código de Graficcación------------------------------
+# matplotlib se importa hasta que se necesita para graficar
+import matplotlib.pyplot as plt
 plt.plot(x,Ta, '-', label = 'Sol. analítica') # Sol. analítica
 plt.plot(x,T,'o', label = 'Sol. FVM')
 plt.title('Solución de $k (\partial^2 T/\partial x^2) = 0$ con FVM')
@@ -36,7 +36,6 @@ $T = \left( \frac{T_B - T_A}{L} + \frac{q}{2k}(L - x) \right) x + T_A$
 
 import FiniteVolumeMethod as fvm
 import numpy as np
-import matplotlib.pyplot as plt
 
 #definición de la función que representa la solución analítica que se muestra en Malalasekera
 def analyticSol(x):
@@ -87,12 +86,12 @@ df1.bcDirichlet('RIGHT_WALL', T[-1]) # de acuerdo a las cond. de frontera
 # Se construye el sistema lineal de ecuaciones a partir de los coef. de FVM
 #
 Su = df1.Su()  # Vector del lado derecho
-A = fvm.Matrix(malla.volumes())  # Matriz del sistema
+A = fvm.Matrix(malla.volumes(), storage = 'banded')  # Matriz del sistema (sólo las 5 diagonales)
 A.build(df1) # Construcción de la matriz en la memoria
 #
-# Se resuelve el sistema usando un algoritmo del módulo linalg
+# Se resuelve el sistema (linalg para 'dense', solve_banded para 'banded')
 #
-T[1:-1] = np.linalg.solve(A.mat(),Su[1:-1])
+T[1:-1] = A.solve(Su[1:-1])
 #
 # Se construye un vector de coordenadas del dominio
 #
@@ -119,6 +118,8 @@ x *= 100 # Transformación a [cm]
 x1 *= 100
 
 #---------------Graficación de la solución---------------------------------
+# matplotlib se importa hasta que se necesita para graficar
+import matplotlib.pyplot as plt
 plt.plot(x1,Ta, '-', label = 'Sol. analítica') 
 plt.plot(x,T,'o', label = 'Sol. FVM')
 plt.title('Solución de $k (\partial^2 T/\partial x^2)+q = 0$ con FVM')
@@ -54,7 +54,6 @@ $
 
 import FiniteVolumeMethod as fvm
 import numpy as np
-import matplotlib.pyplot as plt
 
 #Definición de la solución que representa la solución analítica que se muestra en Malalasekera
 def analyticSol(x):
@@ -107,12 +106,12 @@ df1.bcNeumman('RIGHT_WALL', fluxB) # de acuerdo a las cond. de frontera
 # Se construye el sistema lineal de ecuaciones a partir de los coef. de FVM
 #
 Su = df1.Su()  # Vector del lado derecho
-A = fvm.Matrix(malla.volumes())  # Matriz del sistema
+A = fvm.Matrix(malla.volumes(), storage = 'banded')  # Matriz del sistema (sólo las 5 diagonales)
 A.build(df1) # Construcción de la matriz en la memoria
 #
-# Se resuelve el sistema usando un algoritmo del módulo linalg
+# Se resuelve el sistema (linalg para 'dense', solve_banded para 'banded')
 #
-T[1:-1] = np.linalg.solve(A.mat(),Su[1:-1])
+T[1:-1] = A.solve(Su[1:-1])
 T[-1] = T[-2] # Condición de frontera tipo Neumman
 #
 # Se construye un vector de coordenadas del dominio
@@ -139,6 +138,8 @@ Ta = analyticSol(x1)
 #
 #  Se grafica la solución
 #
+# matplotlib se importa hasta que se necesita para graficar
+import matplotlib.pyplot as plt
 plt.plot(x1,Ta, '-', label = 'Sol. analítica') 
 plt.plot(x,T,'o', label = 'Sol. FVM')
 plt.title('Solución de $\partial^2 T/\partial x^2 - hP(T-T_\infty) = 0$ con FVM')
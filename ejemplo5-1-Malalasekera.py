@@ -22,7 +22,6 @@ ___________________________________________________________
 
 import FiniteVolumeMethod as fvm
 import numpy as np
-import matplotlib.pyplot as plt
 
 # Se establece la función que representa la solución analítica 
 def analyticSol(x):
@@ -62,13 +61,12 @@ fvm.printData(Longitud = L,
 #
 # Se aloja memoria para los coeficientes
 #
-coef = fvm.Coefficients()
+coef = fvm.Coefficients(nvx, delta)
 coef.alloc(nvx)
-#fvm.Coefficients.alloc(nvx)
 #
 #  Calculamos los coeficientes de FVM de la Difusión
 #
-dif = fvm.Diffusion1D(nvx, Gamma = Gamma, dx = delta)
+dif = fvm.Diffusion1D(nvx, Gamma = Gamma, dx = delta, coef = coef)
 dif.calcCoef() #se obtienen coeficientes Difusivos y se agregan
 
 #---------------------------------------------------------------------------------
@@ -83,7 +81,7 @@ dif.calcCoef() #se obtienen coeficientes Difusivos y se agregan
 
 #  Calculamos los coeficientes de FVM de la Advección
 #
-adv = fvm.Advection1D(nvx, rho = rho, dx = delta)
+adv = fvm.Advection1D(nvx, rho = rho, dx = delta, coef = coef)
 adv.setU(u)
 adv.calcCoef(metodo) #se obtienen coeficientes advectivos de acuerdo al esquema seleccionado y se agregan
 
@@ -119,15 +117,15 @@ print('.'+'-'*70+'.')
 # Se construye el sistema lineal de ecuaciones a partir de los coef. de FVM
 #
 Su = coef.Su()  # Vector del lado derecho
-A = fvm.Matrix(malla.volumes())  # Matriz del sistema
+A = fvm.Matrix(malla.volumes(), storage = 'banded')  # Matriz del sistema (sólo las 5 diagonales)
 A.build(coef) # Construcción de la matriz en la memoria
 #print('A = ', A.mat(),
 #      'b = {}'.format(Su[1:-1]), sep='\n')
 #print('.'+'-'*70+'.')
 #
-# Se resuelve el sistema usando un algoritmo del módulo linalg
+# Se resuelve el sistema (linalg para 'dense', solve_banded para 'banded')
 #
-phi[1:-1] = np.linalg.solve(A.mat(),Su[1:-1])
+phi[1:-1] = A.solve(Su[1:-1])
 print('Solución = {}'.format(phi))
 print('.'+'-'*70+'.')
 #
@@ -153,6 +151,8 @@ phi_a = analyticSol(x1)
 
 #
 #----------------------Graficación de solución --------------------------------------
+# matplotlib se importa hasta que se necesita para graficar
+import matplotlib.pyplot as plt
 plt.plot(x1,phi_a, '-', label = 'Sol. analítica') 
 plt.plot(x,phi,'--o', label = 'Sol. '+metodo)
 plt.title('Solución de $\partial(p u \phi)/\partial x= \partial (\Gamma \partial\phi/\partial x)/\partial x$ caso %d' %caso)